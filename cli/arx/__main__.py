@@ -1,10 +1,63 @@
-import typer, webbrowser, os, json, requests, datetime as dt
+import typer, webbrowser, os, sys, json, requests, datetime as dt
+import asyncio, time, hashlib, httpx
 from typing import Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 app = typer.Typer(add_completion=False, help="arXiv News Agent CLI")
 # app = typer.Typer()
 
 API = os.environ.get("ARX_API", "http://localhost:8787")
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "arx")
+PULL_TTL_S = 3600
+
+# Shared session: keep-alive across calls + retry on transient gateway errors
+SESSION = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=(502, 503, 504)),
+)
+SESSION.mount("http://", _adapter)
+SESSION.mount("https://", _adapter)
+
+def _candidate_ids(state: Optional[str], query: Optional[str], limit: int,
+                   missing_key: Optional[str]) -> list[int]:
+    """Up to `limit` paper ids picked by the server exactly as the server batch endpoints
+    pick them (exact state, optionally only papers without `signals[missing_key]`, the
+    BM25 top `limit` for `query`), without their payloads."""
+    params = {"state": state, "query": query, "missing": missing_key, "limit": limit}
+    r = SESSION.get(f"{API}/v1/papers/ids", params=params, timeout=60)
+    r.raise_for_status()
+    return r.json()["ids"]
+
+async def _post_many(paths: list[str], provider: Optional[str], concurrency: int,
+                     delay_ms: int) -> list[bool]:
+    """POST to each path with at most `concurrency` in flight and request starts
+    spaced by at least `delay_ms` (provider rate limits)."""
+    sem = asyncio.Semaphore(max(1, concurrency))
+    gap = max(0, delay_ms) / 1000.0
+    lock = asyncio.Lock()
+    next_at = 0.0
+    params = {"provider": provider} if provider else None
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=API, timeout=120, limits=limits) as client:
+        async def one(path: str) -> bool:
+            nonlocal next_at
+            async with sem:
+                async with lock:
+                    wait = next_at - time.monotonic()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    next_at = time.monotonic() + gap
+                try:
+                    r = await client.post(path, params=params)
+                    r.raise_for_status()
+                    return True
+                except httpx.HTTPError:
+                    return False
+        return await asyncio.gather(*(one(p) for p in paths))
 
 @app.command("pull")
 def pull(
@@ -13,6 +66,8 @@ def pull(
     cats: Optional[str] = typer.Option(None, help="Comma-separated categories (alternative to --cat)"),
     max_results: int = typer.Option(200, help="Max results to fetch"),
     oai: bool = typer.Option(False, help="Use OAI-PMH incremental harvester"),
+    force: bool = typer.Option(False, "--force",
+                               help="Pull even if the same pull ran within the last hour"),
 ):
     """
     Ingest today's papers for one or more categories.
@@ -20,6 +75,7 @@ def pull(
       1) Repeated --cat/-c options
       2) --cats comma-separated string
       3) None → let server use config/env defaults
+    An identical pull that succeeded within the last hour is skipped unless --force.
     """
     url = f"{API}/v1/ingest/oai" if oai else f"{API}/v1/ingest/today"
     cats_list = None
@@ -31,7 +87,23 @@ def pull(
         payload = {"days": days, "cats": cats_list, "use_checkpoint": True}
     else:
         payload = {"days": days, "cats": cats_list, "max_results": max_results}
-    r = requests.post(url, json=payload, timeout=120)
+    stamp_args = {"cats": cats_list, "days": days, "oai": oai, "max_results": max_results}
+    stamp_key = hashlib.sha1(json.dumps(stamp_args, sort_keys=True).encode()).hexdigest()
+    stamp = os.path.join(CACHE_DIR, f"pull_{stamp_key}.ts")
+    if not force and os.path.exists(stamp):
+        try:
+            with open(stamp) as f:
+                age = time.time() - float(f.read().strip() or 0)
+        except (OSError, ValueError):
+            age = PULL_TTL_S
+        if age < PULL_TTL_S:
+            typer.echo(f"skipped (cached {int(age // 60)}m ago; use --force)")
+            return
+    r = SESSION.post(url, json=payload, timeout=120)
+    if r.ok:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(stamp, "w") as f:
+            f.write(str(time.time()))
     typer.echo(r.json())
 
 @app.command("score-batch")
@@ -40,21 +112,18 @@ def score_batch(
     provider: Optional[str] = typer.Option(None, help="LLM provider: openai|deepseek (overrides env)"),
     limit: int = typer.Option(20, min=1, help="Max papers to score"),
     only_missing: bool = typer.Option(True, help="Only score papers missing rubric"),
-    query: Optional[str] = typer.Option(None, help="Optional BM25 query to narrow set"),
-    delay_ms: int = typer.Option(800, min=0, help="Delay between calls (ms) to avoid rate spikes"),
+    query: Optional[str] = typer.Option(None,
+                                        help="Optional BM25 query: take the top `limit` matches"),
+    delay_ms: int = typer.Option(800, min=0,
+                                 help="Min spacing between call starts (ms) to avoid rate spikes"),
+    concurrency: int = typer.Option(8, min=1, help="Max in-flight requests"),
 ):
-    """Batch score papers with LLM rubric and persist results."""
-    url = f"{API}/v1/papers/score-batch"
-    payload = {
-        "state": state,
-        "provider": provider,
-        "limit": limit,
-        "only_missing": only_missing,
-        "query": query,
-        "delay_ms": delay_ms,
-    }
-    r = requests.post(url, json=payload, timeout=600)
-    typer.echo(r.json())
+    """Batch score papers with LLM rubric and persist results (concurrent per-paper calls)."""
+    ids = _candidate_ids(state, query, limit, "rubric" if only_missing else None)
+    paths = [f"/v1/papers/{i}/score" for i in ids]
+    ok = asyncio.run(_post_many(paths, provider, concurrency, delay_ms))
+    done = [i for i, good in zip(ids, ok) if good]
+    typer.echo({"ok": True, "scored": len(done), "failed": len(ids) - len(done), "ids": done})
 
 @app.command("suggest-batch")
 def suggest_batch(
@@ -62,21 +131,19 @@ def suggest_batch(
     provider: Optional[str] = typer.Option(None, help="LLM provider: openai|deepseek (overrides env)"),
     limit: int = typer.Option(20, min=1, help="Max papers to suggest for"),
     only_missing: bool = typer.Option(True, help="Only papers missing suggested tags"),
-    query: Optional[str] = typer.Option(None, help="Optional BM25 query to narrow set"),
-    delay_ms: int = typer.Option(800, min=0, help="Delay between calls (ms) to avoid rate spikes"),
+    query: Optional[str] = typer.Option(None,
+                                        help="Optional BM25 query: take the top `limit` matches"),
+    delay_ms: int = typer.Option(800, min=0,
+                                 help="Min spacing between call starts (ms) to avoid rate spikes"),
+    concurrency: int = typer.Option(8, min=1, help="Max in-flight requests"),
 ):
-    """Batch suggest tags with LLM and persist to signals.suggested_tags."""
-    url = f"{API}/v1/papers/suggest-tags-batch"
-    payload = {
-        "state": state,
-        "provider": provider,
-        "limit": limit,
-        "only_missing": only_missing,
-        "query": query,
-        "delay_ms": delay_ms,
-    }
-    r = requests.post(url, json=payload, timeout=600)
-    typer.echo(r.json())
+    """Batch suggest tags with LLM and persist to signals.suggested_tags
+    (concurrent per-paper calls)."""
+    ids = _candidate_ids(state, query, limit, "suggested_tags" if only_missing else None)
+    paths = [f"/v1/papers/{i}/suggest-tags" for i in ids]
+    ok = asyncio.run(_post_many(paths, provider, concurrency, delay_ms))
+    done = [i for i, good in zip(ids, ok) if good]
+    typer.echo({"ok": True, "suggested": len(done), "failed": len(ids) - len(done), "ids": done})
 
 @app.command("list")
 def list_cmd(state: Optional[str] = typer.Option(None, help="triage|shortlist|archived|hidden"),
@@ -85,7 +152,7 @@ def list_cmd(state: Optional[str] = typer.Option(None, help="triage|shortlist|ar
     url = f"{API}/v1/papers"
     params = {"state": state, "page": 1, "page_size": top}
     if query: params["query"] = query
-    r = requests.get(url, params=params, timeout=60)
+    r = SESSION.get(url, params=params, timeout=60)
     data = r.json()
     for p in data.get("data", []):
         typer.echo(f"[{p['id']}] {p['title']}  —  {p['authors']}  [{p['primary_category']}]")
@@ -94,20 +161,59 @@ def list_cmd(state: Optional[str] = typer.Option(None, help="triage|shortlist|ar
 @app.command("keep")
 def keep(paper_id: int):
     url = f"{API}/v1/papers/{paper_id}/state"
-    r = requests.post(url, json={"state": "shortlist"}, timeout=30)
+    r = SESSION.post(url, json={"state": "must_read"}, timeout=30)
     typer.echo(r.json())
 
 @app.command("meh")
 def meh(paper_id: int):
     url = f"{API}/v1/papers/{paper_id}/state"
-    r = requests.post(url, json={"state": "archived"}, timeout=30)
+    r = SESSION.post(url, json={"state": "archived"}, timeout=30)
     typer.echo(r.json())
 
 @app.command("tag")
 def tag(paper_id: int, tags: str):
     url = f"{API}/v1/papers/{paper_id}/tags"
     add = [t.strip() for t in tags.split(",") if t.strip()]
-    r = requests.post(url, json={"add": add}, timeout=30)
+    r = SESSION.post(url, json={"add": add}, timeout=30)
+    typer.echo(r.json())
+
+def _ids_from_args_or_stdin(ids: Optional[list[int]]) -> list[int]:
+    if ids:
+        return list(ids)
+    if sys.stdin.isatty():
+        return []
+    return [int(tok) for tok in sys.stdin.read().split() if tok.strip()]
+
+def _bulk_state(ids: Optional[list[int]], state: str):
+    id_list = _ids_from_args_or_stdin(ids)
+    if not id_list:
+        typer.echo("no ids given (pass as arguments or on stdin)")
+        raise typer.Exit(1)
+    r = SESSION.post(f"{API}/v1/papers/bulk-state", json={"ids": id_list, "state": state},
+                     timeout=30)
+    typer.echo(r.json())
+
+_IDS_ARG = typer.Argument(None, help="Paper ids; read from stdin if omitted")
+
+@app.command("keep-many")
+def keep_many(ids: Optional[list[int]] = _IDS_ARG):
+    """Mark many papers must_read (shortlist) in one request."""
+    _bulk_state(ids, "must_read")
+
+@app.command("meh-many")
+def meh_many(ids: Optional[list[int]] = _IDS_ARG):
+    """Archive many papers in one request."""
+    _bulk_state(ids, "archived")
+
+@app.command("tag-many")
+def tag_many(tags: str, ids: Optional[list[int]] = _IDS_ARG):
+    """Add comma-separated tags to many papers in one request."""
+    id_list = _ids_from_args_or_stdin(ids)
+    if not id_list:
+        typer.echo("no ids given (pass as arguments or on stdin)")
+        raise typer.Exit(1)
+    add = [t.strip() for t in tags.split(",") if t.strip()]
+    r = SESSION.post(f"{API}/v1/papers/bulk-tags", json={"ids": id_list, "add": add}, timeout=30)
     typer.echo(r.json())
 
 @app.command("digest")
@@ -117,19 +223,20 @@ def digest(date: Optional[str] = typer.Option(None, help="YYYY-MM-DD (default: t
     if not date:
         date = dt.date.today().isoformat()
     url = f"{API}/v1/digests/daily"
-    r = requests.get(url, params={"date": date, "format": "html", "top_k": top_k}, timeout=60)
-    data = r.json()
-
-    if "data" in data:
+    params = {"date": date, "format": "html", "top_k": top_k, "accept": "html"}
+    headers = {"Accept": "text/html"}
+    with SESSION.get(url, params=params, headers=headers, timeout=60, stream=True) as r:
+        if not r.ok:
+            typer.echo(r.text)
+            return
         # Write to temp file
         path = f"/tmp/arx_digest_{date}.html"
-        with open(path, "w") as f:
-            f.write(data["data"])
-        if open_html:
-            webbrowser.open(f"file://{path}")
-        typer.echo(f"Wrote {path}")
-    else:
-        typer.echo(data)
+        with open(path, "wb") as f:
+            for chunk in r.iter_content(chunk_size=65536):
+                f.write(chunk)
+    if open_html:
+        webbrowser.open(f"file://{path}")
+    typer.echo(f"Wrote {path}")
 
 if __name__ == "__main__":
     app()
@@ -1,9 +1,10 @@
 import os
 import asyncio
+import orjson
 from typing import AsyncGenerator
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base
-from sqlalchemy import text
+from sqlalchemy import text, event
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -27,13 +28,109 @@ def _default_db_url() -> str:
 
 ASYNC_DATABASE_URL = _default_db_url()
 
-engine = create_async_engine(ASYNC_DATABASE_URL, echo=False, future=True)
+def _engine_kwargs(url: str) -> dict:
+    if url.startswith("sqlite"):
+        # Wait on the single-writer lock instead of failing with "database is locked"
+        return {"connect_args": {"timeout": 30}}
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "20")),
+        "max_overflow": int(os.getenv("DB_POOL_OVERFLOW", "40")),
+        # Fail a request after a bounded wait instead of stalling on a drained pool
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_pre_ping": True,
+        "pool_recycle": 1800,
+    }
+
+def _json_dumps(v) -> str:
+    # orjson for JSON columns (extra/tags/signals/payload/config values)
+    return orjson.dumps(v, option=orjson.OPT_NON_STR_KEYS).decode()
+
+engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    echo=False,
+    future=True,
+    json_serializer=_json_dumps,
+    json_deserializer=orjson.loads,
+    **_engine_kwargs(ASYNC_DATABASE_URL),
+)
+if ASYNC_DATABASE_URL.startswith("sqlite"):
+    @event.listens_for(engine.sync_engine, "connect")
+    def _sqlite_pragmas(dbapi_conn, _record):
+        # WAL lets digest reads proceed during ingest writes; NORMAL sync is safe under WAL
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA cache_size=-65536")
+        cursor.close()
+
 SessionLocal = async_sessionmaker(engine, expire_on_commit=False, autoflush=False, autocommit=False, class_=AsyncSession)
 
 async def init_db():
     async with engine.begin() as conn:
-        from .models import Paper, Action, ConfigKV
+        from .models import Paper, Action, ConfigKV, LLMCache
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
+        await conn.run_sync(_dedupe_papers)
+        await conn.run_sync(_create_missing_indexes)
+        await conn.run_sync(_backfill_announced_dates)
+
+def _add_missing_columns(sync_conn) -> None:
+    # create_all never alters existing tables; add new nullable columns in place
+    from sqlalchemy import inspect
+    insp = inspect(sync_conn)
+    for table in Base.metadata.sorted_tables:
+        have = {c["name"] for c in insp.get_columns(table.name)}
+        for col in table.columns:
+            if col.name not in have and col.nullable:
+                col_type = col.type.compile(dialect=sync_conn.dialect)
+                sync_conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {col.name} {col_type}"))
+
+def _dedupe_papers(sync_conn) -> None:
+    # Older DBs may hold duplicate (arxiv_id, version) rows, which would make the
+    # unique index fail to build; keep the newest row and repoint actions to it
+    from sqlalchemy import select, update, delete, func, bindparam
+    from loguru import logger
+    from .models import Paper, Action
+    groups = sync_conn.execute(
+        select(Paper.arxiv_id, Paper.version, func.max(Paper.id))
+        .group_by(Paper.arxiv_id, Paper.version)
+        .having(func.count() > 1)
+    ).all()
+    if not groups:
+        return
+    remap = []
+    for arxiv_id, version, keep in groups:
+        ids = sync_conn.execute(
+            select(Paper.id).where(Paper.arxiv_id == arxiv_id, Paper.version == version, Paper.id != keep)
+        ).scalars()
+        remap.extend({"old": i, "keep": keep} for i in ids)
+    a = Action.__table__
+    sync_conn.execute(update(a).where(a.c.paper_id == bindparam("old")).values(paper_id=bindparam("keep")), remap)
+    sync_conn.execute(delete(Paper).where(Paper.id.in_([r["old"] for r in remap])))
+    logger.warning(f"Removed {len(remap)} duplicate paper rows across {len(groups)} (arxiv_id, version) pairs")
+
+def _create_missing_indexes(sync_conn) -> None:
+    # create_all skips indexes on tables that already exist (older DBs)
+    for table in Base.metadata.sorted_tables:
+        for idx in table.indexes:
+            idx.create(sync_conn, checkfirst=True)
+
+def _backfill_announced_dates(sync_conn) -> None:
+    # Rows written before papers.announced_date existed
+    from sqlalchemy import select, update, bindparam
+    from .models import Paper
+    from .services.announce import announced_date
+    rows = sync_conn.execute(
+        select(Paper.id, Paper.submitted_at).where(Paper.announced_date.is_(None), Paper.submitted_at.is_not(None))
+    ).all()
+    params = [{"pid": i, "ad": announced_date(s)} for i, s in rows if announced_date(s)]
+    if params:
+        t = Paper.__table__
+        # updated_ts assigned to itself so the onupdate default doesn't touch every row
+        stmt = update(t).where(t.c.id == bindparam("pid")).values(announced_date=bindparam("ad"), updated_ts=t.c.updated_ts)
+        sync_conn.execute(stmt, params)
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     async with SessionLocal() as session:
@@ -1,13 +1,36 @@
 from fastapi import FastAPI, Depends, Query, HTTPException, Body
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
+from contextlib import asynccontextmanager
+from sqlalchemy import text
+import asyncio
 import os
-from .db import init_db, get_session, Settings
+import httpx
+from .db import init_db, get_session, Settings, engine
 from .routers import papers, digests, config as cfg, ingest
 from .services.ingest import ensure_default_config
 
-app = FastAPI(title="arXiv News Agent", version="0.1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await asyncio.gather(init_db(), ensure_default_config())
+    # Warm the pool so the first request doesn't pay connect/PRAGMA cost;
+    # the digest template and config.yaml are already loaded at import.
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    # One pooled client for upstream fetches (PDF proxy, arXiv/OAI ingest) so connections/TLS are reused
+    app.state.http = httpx.AsyncClient(
+        timeout=30.0,
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+    )
+    try:
+        yield
+    finally:
+        await app.state.http.aclose()
+
+app = FastAPI(title="arXiv News Agent", version="0.1.0", default_response_class=ORJSONResponse, lifespan=lifespan)
 
 # CORS (allow local web apps)
 app.add_middleware(
@@ -32,11 +55,6 @@ async def allow_private_network(request, call_next):
         pass
     return response
 
-@app.on_event("startup")
-async def startup_event():
-    await init_db()
-    await ensure_default_config()
-
 # Routers
 app.include_router(papers.router, prefix="/v1")
 app.include_router(ingest.router, prefix="/v1")
@@ -1,10 +1,11 @@
-from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import String, Integer, DateTime, Text, JSON, Enum
+from sqlalchemy.orm import Mapped, mapped_column, validates
+from sqlalchemy import String, Integer, DateTime, Text, JSON, Enum, Index
 from sqlalchemy.sql import func
 from typing import Optional
 from datetime import datetime
 import enum
 from .db import Base
+from .services.announce import announced_date
 
 class PaperState(str, enum.Enum):
     triage = "triage"
@@ -15,6 +16,14 @@ class PaperState(str, enum.Enum):
 
 class Paper(Base):
     __tablename__ = "papers"
+    __table_args__ = (
+        Index("ix_papers_state_id", "state", "id"),
+        # Listing order (arxiv_id desc, version desc), with and without a state filter
+        Index("ix_papers_state_arxiv_version", "state", "arxiv_id", "version"),
+        # Unique: the conflict target of the ingest upsert
+        Index("uq_papers_arxiv_version", "arxiv_id", "version", unique=True),
+        Index("ix_papers_primary_cat_submitted", "primary_category", "submitted_at"),
+    )
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     arxiv_id: Mapped[str] = mapped_column(String(32), index=True)
     version: Mapped[int] = mapped_column(Integer, default=1)
@@ -23,8 +32,10 @@ class Paper(Base):
     abstract: Mapped[str] = mapped_column(Text)
     categories: Mapped[str] = mapped_column(String(128))  # comma-separated
     primary_category: Mapped[str] = mapped_column(String(32))
-    submitted_at: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)
+    submitted_at: Mapped[Optional[str]] = mapped_column(String(32), nullable=True, index=True)
     updated_at: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)
+    # ET announce day (YYYY-MM-DD) derived from submitted_at; kept in sync below
+    announced_date: Mapped[Optional[str]] = mapped_column(String(10), nullable=True, index=True)
     links_pdf: Mapped[Optional[str]] = mapped_column(String(256), nullable=True)
     links_html: Mapped[Optional[str]] = mapped_column(String(256), nullable=True)
     links_abs: Mapped[Optional[str]] = mapped_column(String(256), nullable=True)
@@ -35,6 +46,11 @@ class Paper(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_ts: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+    @validates("submitted_at")
+    def _sync_announced_date(self, _key, value):
+        self.announced_date = announced_date(value)
+        return value
+
 class Action(Base):
     __tablename__ = "actions"
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
@@ -48,3 +64,21 @@ class ConfigKV(Base):
     __tablename__ = "config_kv"
     key: Mapped[str] = mapped_column(String(64), primary_key=True)
     value: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+
+class LLMCache(Base):
+    __tablename__ = "llm_cache"
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)  # sha256 hex
+    value: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    ts: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+class LLMBatch(Base):
+    """A provider Batch API job submitted by score-batch / suggest-tags-batch."""
+    __tablename__ = "llm_batches"
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    batch_id: Mapped[str] = mapped_column(String(64), unique=True)  # provider's id
+    kind: Mapped[str] = mapped_column(String(16))  # rubric | tags
+    provider: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)
+    items: Mapped[dict] = mapped_column(JSON)  # custom id (paper id) -> llm_cache key
+    status: Mapped[str] = mapped_column(String(32), default="submitted")
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_ts: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
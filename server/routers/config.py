@@ -1,7 +1,10 @@
 from fastapi import APIRouter, Depends, Body
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import func, cast, JSON
+from sqlalchemy.dialects.postgresql import JSONB, insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from typing import Dict, Any
+import json
 import yaml
 import os
 from ..db import get_session
@@ -11,26 +14,53 @@ router = APIRouter(tags=["config"])
 
 DEFAULT_CONFIG_PATH = os.path.join(os.getcwd(), "config.yaml")
 
+def _read_file_config() -> Dict[str, Any]:
+    if os.path.exists(DEFAULT_CONFIG_PATH):
+        with open(DEFAULT_CONFIG_PATH, "r") as f:
+            return yaml.safe_load(f) or {}
+    return {}
+
+# config.yaml is read once per process; restart to pick up edits
+_FILE_CFG: Dict[str, Any] = _read_file_config()
+
 async def _load_config(session: AsyncSession):
-    res = await session.execute(select(ConfigKV).where(ConfigKV.key == "config"))
-    kv = res.scalar_one_or_none()
+    kv = await session.get(ConfigKV, "config")
     if kv and kv.value:
         return kv.value
     # fallback to file
-    if os.path.exists(DEFAULT_CONFIG_PATH):
-        with open(DEFAULT_CONFIG_PATH, "r") as f:
-            return yaml.safe_load(f)
-    return {}
+    return _FILE_CFG
 
 @router.get("/config")
 async def get_config(session: AsyncSession = Depends(get_session)):
     cfg = await _load_config(session)
     return {"ok": True, "data": cfg}
 
+def _merge_upsert(dialect: str, body: Dict[str, Any]):
+    """Single INSERT .. ON CONFLICT DO UPDATE .. RETURNING that shallow-merges
+    `body` into the stored config (top-level keys replaced, like dict.update)."""
+    if dialect == "sqlite":
+        ins = sqlite_insert(ConfigKV).values(key="config", value=body)
+        args = []
+        for k, v in body.items():
+            args += [f'$."{k}"', func.json(json.dumps(v))]
+        merged = func.json_set(func.coalesce(ConfigKV.value, func.json_object()), *args) if args else ConfigKV.value
+    else:
+        ins = pg_insert(ConfigKV).values(key="config", value=body)
+        merged = cast(
+            func.coalesce(cast(ConfigKV.value, JSONB), func.jsonb_build_object()).op("||")(cast(ins.excluded.value, JSONB)),
+            JSON,
+        )
+    return ins.on_conflict_do_update(index_elements=[ConfigKV.key], set_={"value": merged}).returning(ConfigKV.value)
+
 @router.put("/config")
 async def put_config(body: Dict[str, Any] = Body(...), session: AsyncSession = Depends(get_session)):
-    res = await session.execute(select(ConfigKV).where(ConfigKV.key == "config"))
-    kv = res.scalar_one_or_none()
+    dialect = session.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql") and not any('"' in k for k in body):
+        res = await session.execute(_merge_upsert(dialect, body))
+        value = res.scalar_one()
+        await session.commit()
+        return {"ok": True, "data": value}
+    kv = await session.get(ConfigKV, "config")
     if not kv:
         kv = ConfigKV(key="config", value=body)
     else:
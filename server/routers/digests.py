@@ -1,28 +1,64 @@
 from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi.responses import HTMLResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.orm import load_only
 from datetime import datetime, timezone, timedelta
 from typing import Optional
+from collections import OrderedDict
 from jinja2 import Environment, FileSystemLoader, select_autoescape
 import os
+import time
 from ..db import get_session
 from ..models import Paper, PaperState
 from ..services.ingest import parse_date_only
-from .papers import _announced_date
 
 router = APIRouter(tags=["digests"])
 
 TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates")
 env = Environment(
     loader=FileSystemLoader(TEMPLATES_DIR),
-    autoescape=select_autoescape(["html", "xml"])
+    autoescape=select_autoescape(["html", "xml"]),
+    cache_size=400,
+    auto_reload=False,
 )
+# Compiled once; restart the server to pick up template edits
+DIGEST_TMPL = env.get_template("digest.html")
+
+# (date, format, top_k) -> (monotonic ts, response). Past digests only change when
+# papers are ingested or re-triaged, so those paths clear the cache explicitly.
+_DIGEST_CACHE: "OrderedDict[tuple[str, str, int], tuple[float, dict]]" = OrderedDict()
+DIGEST_TTL_TODAY = 60
+DIGEST_TTL_PAST = 24 * 3600
+DIGEST_CACHE_MAXSIZE = 256
+
+def clear_digest_cache() -> int:
+    n = len(_DIGEST_CACHE)
+    _DIGEST_CACHE.clear()
+    return n
+
+_DIGEST_COLUMNS = load_only(
+    Paper.id, Paper.arxiv_id, Paper.title, Paper.authors, Paper.primary_category, Paper.state,
+    Paper.links_abs, Paper.links_pdf, Paper.links_html,
+)
+
+_S_MUST = frozenset({PaperState.must_read.value, "shortlist"})
+_S_FUTR = PaperState.further_read.value
+_S_TRI = PaperState.triage.value
 
 def pick_top(papers, top_k=10):
-    # Prefer must_read → further_read → triage (recent)
-    must = [p for p in papers if p.state == PaperState.must_read.value or p.state == "shortlist"]
-    futr = [p for p in papers if p.state == PaperState.further_read.value]
-    tri = [p for p in papers if p.state == PaperState.triage.value]
+    # Prefer must_read → further_read → triage (recent); other states are skipped
+    must, futr, tri = [], [], []
+    for p in papers:
+        s = p.state
+        if s in _S_MUST:
+            must.append(p)
+            if len(must) >= top_k:
+                break
+        elif s == _S_FUTR:
+            futr.append(p)
+        elif s == _S_TRI:
+            tri.append(p)
     res = must[:top_k]
     if len(res) < top_k:
         res += futr[: (top_k - len(res))]
@@ -35,40 +71,72 @@ async def digest_daily(
     date: Optional[str] = Query(None, description="YYYY-MM-DD (default: today UTC)"),
     format: str = Query("markdown", pattern="^(markdown|html|json)$"),
     top_k: int = Query(10, ge=1, le=100),
+    accept: str = Query("json", pattern="^(json|html)$", description="html: raw text/html body (format=html only)"),
     session: AsyncSession = Depends(get_session)
 ):
-    if date:
-        d = parse_date_only(date)
-    else:
-        # Default digest date in UTC+8 (configurable via DIGEST_TZ_OFFSET_HOURS)
-        try:
-            offset_hours = int(os.getenv("DIGEST_TZ_OFFSET_HOURS", "8"))
-        except ValueError:
-            offset_hours = 8
-        local_today = datetime.now(timezone.utc).astimezone(timezone(timedelta(hours=offset_hours))).date()
-        d = local_today
+    # Default digest date in UTC+8 (configurable via DIGEST_TZ_OFFSET_HOURS)
+    try:
+        offset_hours = int(os.getenv("DIGEST_TZ_OFFSET_HOURS", "8"))
+    except ValueError:
+        offset_hours = 8
+    local_today = datetime.now(timezone.utc).astimezone(timezone(timedelta(hours=offset_hours))).date()
+    d = parse_date_only(date) if date else local_today
     d_str = d.isoformat()
 
-    # Select papers whose announced date matches the requested date.
-    # Uses the same ET-window policy as the papers API.
-    stmt = select(Paper).order_by(Paper.id.desc())
-    res = await session.execute(stmt)
-    rows = res.scalars().all()
+    key = (d_str, format, top_k)
+    ttl = DIGEST_TTL_TODAY if d >= local_today else DIGEST_TTL_PAST
+    raw_html = format == "html" and accept == "html"
+    hit = _DIGEST_CACHE.get(key)
+    if hit and time.monotonic() - hit[0] < ttl:
+        _DIGEST_CACHE.move_to_end(key)
+        return HTMLResponse(hit[1]["data"]) if raw_html else hit[1]
+    if hit:
+        del _DIGEST_CACHE[key]
+
+    # Papers announced on the requested date (ET schedule, persisted at write time)
+    # Only the columns digests render; skips abstract and the JSON blobs
+    stmt = (
+        select(Paper)
+        .options(_DIGEST_COLUMNS)
+        .where(Paper.announced_date == d_str)
+        .order_by(Paper.id.desc())
+    )
+    # Stream rows; once top_k must-reads are seen (newest first), pick_top cannot
+    # use anything further down, so stop fetching.
+    result = await session.stream_scalars(stmt)
     day_rows = []
-    for p in rows:
-        ad = _announced_date(p.submitted_at)
-        if ad == d_str:
-            day_rows.append(p)
+    n_must = 0
+    async for p in result:
+        day_rows.append(p)
+        if p.state in _S_MUST:
+            n_must += 1
+            if n_must >= top_k:
+                break
+    await result.close()
     top = pick_top(day_rows, top_k=top_k)
 
+    if raw_html:
+        # Rendered incrementally; only the JSON-wrapped variant is cached
+        return StreamingResponse(DIGEST_TMPL.generate(date=d_str, papers=top), media_type="text/html")
     if format == "json":
-        return {"ok": True, "data": [{"id": p.id, "title": p.title, "arxiv": p.arxiv_id, "state": p.state} for p in top], "count": len(top), "date": d_str}
-    if format == "markdown":
-        md = f"# arXiv Daily Digest — {d_str}\n\n"
-        for i, p in enumerate(top, 1):
-            md += f"{i}. **{p.title}**  \n   {p.authors}  \n   `[{p.primary_category}]` — [abs]({p.links_abs}) · [pdf]({p.links_pdf})\n\n"
-        return {"ok": True, "data": md, "count": len(top), "date": d_str}
-    # html
-    tmpl = env.get_template("digest.html")
-    html = tmpl.render(date=d_str, papers=top)
-    return {"ok": True, "data": html, "count": len(top), "date": d_str}
+        out = {"ok": True, "data": [{"id": p.id, "title": p.title, "arxiv": p.arxiv_id, "state": p.state} for p in top], "count": len(top), "date": d_str}
+    elif format == "markdown":
+        parts = [f"# arXiv Daily Digest — {d_str}\n\n"]
+        parts.extend(
+            f"{i}. **{p.title}**  \n   {p.authors}  \n   `[{p.primary_category}]` — [abs]({p.links_abs}) · [pdf]({p.links_pdf})\n\n"
+            for i, p in enumerate(top, 1)
+        )
+        md = "".join(parts)
+        out = {"ok": True, "data": md, "count": len(top), "date": d_str}
+    else:
+        html = DIGEST_TMPL.render(date=d_str, papers=top)
+        out = {"ok": True, "data": html, "count": len(top), "date": d_str}
+    _DIGEST_CACHE[key] = (time.monotonic(), out)
+    _DIGEST_CACHE.move_to_end(key)
+    while len(_DIGEST_CACHE) > DIGEST_CACHE_MAXSIZE:
+        _DIGEST_CACHE.popitem(last=False)
+    return out
+
+@router.delete("/digests/cache")
+async def digest_cache_clear():
+    return {"ok": True, "cleared": clear_digest_cache()}
@@ -1,11 +1,17 @@
-from fastapi import APIRouter, Depends, Query, HTTPException, Body
+from fastapi import APIRouter, Depends, Query, HTTPException, Body, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, update, or_
+from sqlalchemy import select, func, update, insert, union, or_, not_, tuple_, case, true, cast, bindparam, JSON, Text
+from sqlalchemy.dialects.postgresql import JSONB, aggregate_order_by
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import load_only
 from typing import List, Optional
-from fastapi.responses import StreamingResponse
+from datetime import datetime, timedelta, timezone
+import asyncio
+import heapq
+from fastapi.responses import ORJSONResponse, StreamingResponse
 import httpx
 from ..db import get_session
-from ..models import Paper, Action, PaperState
+from ..models import Paper, Action, PaperState, LLMBatch
 from ..schemas import (
     PapersResponse,
     PaperOut,
@@ -15,62 +21,117 @@ from ..schemas import (
     BatchScoreReq,
     BatchScoreResp,
     PapersHistogram,
+    PaperIds,
     RubricSetReq,
     RubricScores,
     BatchSuggestReq,
     BatchSuggestResp,
+    BulkStateReq,
+    BulkTagsReq,
+    LLMBatchPoll,
 )
-from ..services.scoring import search_bm25
-from ..services.llm import llm_rubric_score, llm_suggest_tags
-from dateutil import tz, parser as dtp
+from ..services.scoring import BM25_CACHE, BM25Index, query_tokens
+from ..services.llm_cache import (
+    cached_rubric_score,
+    cached_suggest_tags,
+    cached_rubric_score_many,
+    cached_suggest_tags_many,
+)
+from ..services import llm_cache
+from ..services.llm import submit_batch, batch_results
+from ..services.announce import announced_date as _announced_date
 
-ET = tz.gettz("America/New_York")
+router = APIRouter(tags=["papers"])
 
-def _announced_date(submitted_iso: Optional[str]) -> Optional[str]:
-    if not submitted_iso:
-        return None
-    try:
-        dt = dtp.parse(submitted_iso)
-        if not dt.tzinfo:
-            from datetime import timezone
-            dt = dt.replace(tzinfo=timezone.utc)
-        from datetime import timedelta, time
-        dt_et = dt.astimezone(ET)
-        wd = dt_et.weekday()  # Mon=0..Sun=6
-        cutoff = time(14, 0)
-
-        def next_weekday(base, target_wd):
-            delta = (target_wd - base.weekday()) % 7
-            return (base + timedelta(days=delta)).date()
-
-        t = dt_et.timetz()
-
-        if wd == 0:  # Monday
-            return (dt_et.date() if t < cutoff else (dt_et + timedelta(days=1)).date()).isoformat()
-        if wd == 1:  # Tuesday
-            return (dt_et.date() if t < cutoff else (dt_et + timedelta(days=1)).date()).isoformat()
-        if wd == 2:  # Wednesday
-            return (dt_et.date() if t < cutoff else (dt_et + timedelta(days=1)).date()).isoformat()
-        if wd == 3:  # Thursday
-            if t < cutoff:
-                return dt_et.date().isoformat()
-            # Thu >=14:00 → announce Sunday (20:00)
-            return next_weekday(dt_et, 6).isoformat()  # Sunday
-        if wd == 4:  # Friday
-            if t < cutoff:
-                # Fri <14:00 belongs to Thu→Fri window → Sunday announce
-                return next_weekday(dt_et, 6).isoformat()
-            # Fri >=14:00 → Monday announce
-            return next_weekday(dt_et, 0).isoformat()
-        if wd == 5:  # Saturday → Monday announce
-            return next_weekday(dt_et, 0).isoformat()
-        if wd == 6:  # Sunday → Monday announce
-            return next_weekday(dt_et, 0).isoformat()
-        return None
-    except Exception:
-        return None
+def _invalidate_caches() -> None:
+    # digests imports this module, so resolve lazily to avoid a cycle
+    from .digests import clear_digest_cache
+    clear_digest_cache()
+    BM25_CACHE.clear()
 
-router = APIRouter(tags=["papers"])
+def _paper_conds(state: Optional[str], category: Optional[str] = None, arxiv_id: Optional[str] = None) -> list:
+    conds = []
+    if state:
+        if state == "must_read":
+            conds.append(or_(Paper.state == "must_read", Paper.state == "shortlist"))
+        else:
+            conds.append(Paper.state == state)
+    if category:
+        conds.append(Paper.primary_category == category)
+    if arxiv_id:
+        conds.append(Paper.arxiv_id == arxiv_id)
+    return conds
+
+_WHITESPACE = " \t\n\r\x0b\x0c"
+
+def _has_note(dialect: str):
+    """SQL form of `bool(str((extra or {}).get("note", "")).strip())`: a non-blank string,
+    or any other JSON value (null included, as str() of it is never empty)."""
+    note = Paper.extra["note"]
+    if dialect == "postgresql":
+        kind, trim = func.json_typeof(note), func.btrim
+        is_text = kind == "string"
+    else:
+        kind, trim = func.json_type(Paper.extra, "$.note"), func.trim
+        is_text = kind == "text"
+    return case((is_text, trim(note.as_string(), _WHITESPACE) != ""), else_=kind.is_not(None))
+
+def _extra_conds(dialect: str, has_note: Optional[bool], tag: Optional[str],
+                 announced_date: Optional[str]) -> list:
+    """Conditions for the note/tag/announce-day filters of the listing endpoints."""
+    conds = []
+    if has_note is not None:
+        conds.append(_has_note(dialect) if has_note else not_(_has_note(dialect)))
+    if tag == "empty":
+        conds.append(_tag_len(dialect) == 0)
+    elif tag:
+        tv = _tag_values(dialect)
+        conds.append(select(tv.c.value).select_from(tv).where(tv.c.value == tag).exists())
+    if announced_date:
+        conds.append(Paper.announced_date == announced_date)
+    return conds
+
+def _search_query(query: Optional[str]) -> Optional[str]:
+    # A query without any token ranks nothing: treat it as no query at all
+    return query if query and query_tokens(query) else None
+
+async def _bm25_index(session: AsyncSession, conds: list, scope: Optional[tuple]) -> BM25Index:
+    """BM25 index over every paper matching `conds`, cached per scope (None: not cached)."""
+    index = None
+    if scope is not None:
+        res = await session.execute(select(func.count(), func.max(Paper.id)).where(*conds))
+        fingerprint = tuple(res.one())
+        index = BM25_CACHE.get(scope, fingerprint)
+        stale = BM25_CACHE.stale(scope) if index is None else None
+        if stale is not None and stale[0][1] is not None and fingerprint[0] > stale[0][0]:
+            index = await _extend_index(session, conds, stale[1], stale[0][1])
+            if index is not None:
+                BM25_CACHE.put(scope, fingerprint, index)
+    if index is None:
+        # Streamed in batches so the driver's row buffer doesn't hold the whole corpus
+        res = await session.stream(
+            select(Paper.id, Paper.title, Paper.abstract)
+            .where(*conds)
+            .order_by(Paper.arxiv_id.desc(), Paper.version.desc())
+            .execution_options(yield_per=2000)
+        )
+        docs = [(i, f"{t} {a}") async for i, t, a in res]
+        # Tokenizing and indexing is CPU-bound; keep it off the event loop
+        index = await asyncio.to_thread(BM25Index.from_docs, docs)
+        if scope is not None:
+            BM25_CACHE.put(scope, fingerprint, index)
+    return index
+
+async def _extend_index(session: AsyncSession, conds: list, index: BM25Index, max_id: int) -> Optional[BM25Index]:
+    """`index` plus the rows added after `max_id`, tokenizing only those; None when the
+    rest of the corpus changed too and a rebuild is needed."""
+    res = await session.execute(
+        select(Paper.id).where(*conds).order_by(Paper.arxiv_id.desc(), Paper.version.desc())
+    )
+    ids = res.scalars().all()
+    res = await session.execute(select(Paper.id, Paper.title, Paper.abstract).where(*conds, Paper.id > max_id))
+    docs = [(i, f"{t} {a}") for i, t, a in res]
+    return await asyncio.to_thread(index.extended, ids, docs)
 
 async def _get_paper_by_arxiv(session: AsyncSession, arxiv_id: str, version: Optional[int] = None) -> Optional[Paper]:
     q = select(Paper).where(Paper.arxiv_id == arxiv_id)
@@ -94,62 +155,74 @@ async def list_papers(
     arxiv_id: Optional[str] = Query(None, description="Filter by exact arXiv id (e.g., 2509.26645)"),
     page: int = Query(1, ge=1),
     page_size: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="Keyset cursor 'arxiv_id:version' (next_cursor of the previous page)"),
     session: AsyncSession = Depends(get_session)
 ):
-    stmt = select(Paper)
-    if state:
-        if state == "must_read":
-            stmt = stmt.where(or_(Paper.state == "must_read", Paper.state == "shortlist"))
+    query = _search_query(query)
+    dialect = session.get_bind().dialect.name
+    conds = _paper_conds(state, category, arxiv_id) + _extra_conds(dialect, has_note, tag, announced_date)
+
+    if not query:
+        total = (await session.execute(select(func.count()).select_from(Paper).where(*conds))).scalar_one()
+        stmt = select(Paper).where(*conds).order_by(Paper.arxiv_id.desc(), Paper.version.desc())
+        stmt = stmt.limit(page_size)
+        if cursor:
+            stmt = stmt.where(tuple_(Paper.arxiv_id, Paper.version) < _parse_cursor(cursor))
         else:
-            stmt = stmt.where(Paper.state == state)
-    # Default ordering: arXiv id (desc) then version (desc)
-    stmt = stmt.order_by(Paper.arxiv_id.desc(), Paper.version.desc())
-    res = await session.execute(stmt)
-    rows = res.scalars().all()
-
-    if has_note is not None:
-        def _has_note(p: Paper) -> bool:
-            try:
-                note = (p.extra or {}).get("note", "")
-                return bool(str(note).strip())
-            except Exception:
-                return False
-        rows = [p for p in rows if _has_note(p) == has_note]
-
-    if category:
-        rows = [p for p in rows if (p.primary_category or "") == category]
-
-    if tag:
-        if tag == "empty":
-            rows = [p for p in rows if not ((p.tags or {}).get("list") or [])]
-        else:
-            rows = [p for p in rows if tag in ((p.tags or {}).get("list") or [])]
-
-    if announced_date:
-        rows = [p for p in rows if _announced_date(p.submitted_at) == announced_date]
+            stmt = stmt.offset((page - 1) * page_size)
+        rows = (await session.execute(stmt)).scalars().all()
+        return _papers_page(rows, total, page_size)
+
+    # Ranked over the SQL-filtered set, hydrating only the page. Note/tag filters follow
+    # edits that don't invalidate the cache, so those (and cursor) indexes aren't cached.
+    scope = ("papers", state, category, arxiv_id, announced_date)
+    if cursor:
+        conds.append(tuple_(Paper.arxiv_id, Paper.version) < _parse_cursor(cursor))
+        page = 1
+    if cursor or has_note is not None or tag:
+        scope = None
+    index = await _bm25_index(session, conds, scope)
+    # Only the top page*page_size ids are ranked; earlier pages are dropped
+    page_ids = index.search(query, k=page * page_size)[(page - 1) * page_size:]
+    rows = await _hydrate(session, page_ids)
+    # BM25 order is not keyset-compatible, so ranked pages get no cursor
+    return _papers_page(rows, len(index), page_size, with_cursor=False)
+
+async def _hydrate(session: AsyncSession, ids: list) -> list:
+    """Full Paper rows for `ids`, in that order."""
+    if not ids:
+        return []
+    res = await session.execute(select(Paper).where(Paper.id.in_(ids)))
+    id_to_p = {p.id: p for p in res.scalars()}
+    return [id_to_p[i] for i in ids if i in id_to_p]
+
+def _paper_dict(p: Paper) -> dict:
+    """PaperOut-shaped dict straight from a trusted ORM row, without Pydantic validation."""
+    return {
+        "id": p.id, "arxiv_id": p.arxiv_id, "version": p.version,
+        "title": p.title, "authors": p.authors, "abstract": p.abstract,
+        "categories": p.categories, "primary_category": p.primary_category,
+        "submitted_at": p.submitted_at, "updated_at": p.updated_at,
+        "links_pdf": p.links_pdf, "links_html": p.links_html, "links_abs": p.links_abs,
+        "extra": p.extra, "tags": p.tags, "signals": p.signals,
+        "state": "must_read" if p.state == "shortlist" else p.state,
+        "announced_date": p.announced_date,
+    }
 
-    if arxiv_id:
-        rows = [p for p in rows if (p.arxiv_id or "") == arxiv_id]
-
-    if query:
-        # naive BM25 over title+abstract in-memory
-        docs = [(p.id, f"{p.title} {p.abstract}") for p in rows]
-        ranked_ids = search_bm25(docs, query)
-        id_to_p = {p.id: p for p in rows}
-        rows = [id_to_p[i] for i in ranked_ids if i in id_to_p]
-
-    total = len(rows)
-    start = (page - 1) * page_size
-    end = start + page_size
-    rows = rows[start:end]
-    out = []
-    for r in rows:
-        item = PaperOut.model_validate(r).model_dump()
-        if item.get("state") == "shortlist":
-            item["state"] = "must_read"
-        item["announced_date"] = _announced_date(r.submitted_at)
-        out.append(item)
-    return {"ok": True, "data": out, "total": total}
+def _parse_cursor(cursor: str):
+    arxiv_id, sep, version = cursor.rpartition(":")
+    if not sep or not arxiv_id or not version.isdigit():
+        raise HTTPException(400, "invalid cursor; expected 'arxiv_id:version'")
+    return arxiv_id, int(version)
+
+def _papers_page(rows, total: int, page_size: int, with_cursor: bool = True):
+    next_cursor = None
+    if with_cursor and len(rows) == page_size:
+        next_cursor = f"{rows[-1].arxiv_id}:{rows[-1].version}"
+    # Returned as a response so FastAPI skips re-validating it against PapersResponse,
+    # which stays on the route for the OpenAPI schema
+    return ORJSONResponse({"ok": True, "data": [_paper_dict(r) for r in rows],
+                           "total": total, "next_cursor": next_cursor})
 
 @router.get("/papers/by_arxiv/{arxiv_id}", response_model=PaperOut)
 async def get_paper_by_arxiv_endpoint(
@@ -160,11 +233,7 @@ async def get_paper_by_arxiv_endpoint(
     paper = await _get_paper_by_arxiv(session, arxiv_id, version)
     if not paper:
         raise HTTPException(404, "paper not found")
-    item = PaperOut.model_validate(paper).model_dump()
-    if item.get("state") == "shortlist":
-        item["state"] = "must_read"
-    item["announced_date"] = _announced_date(paper.submitted_at)
-    return item
+    return ORJSONResponse(_paper_dict(paper))
 
 @router.post("/admin/move_must_to_further")
 async def move_must_to_further(
@@ -181,6 +250,7 @@ async def move_must_to_further(
     stmt = update(Paper).where(cond).values(state="further_read")
     res = await session.execute(stmt)
     await session.commit()
+    _invalidate_caches()
     moved = res.rowcount if hasattr(res, 'rowcount') else None
     return {"ok": True, "moved": moved}
 
@@ -198,90 +268,184 @@ async def papers_stats(
     """
     Global counts for categories and tags across the (optionally filtered) dataset.
     - Respects `state` filter.
-    - If `query` provided, applies BM25 over title+abstract and computes counts over matched set.
+    - `query` only reorders papers, so counts are the same with or without it.
     """
-    stmt = select(Paper)
-    if state:
-        if state == "must_read":
-            stmt = stmt.where(or_(Paper.state == "must_read", Paper.state == "shortlist"))
-        else:
-            stmt = stmt.where(Paper.state == state)
-    # Base order doesn't matter for stats; reuse deterministic ordering
-    stmt = stmt.order_by(Paper.arxiv_id.desc(), Paper.version.desc())
-    res = await session.execute(stmt)
-    rows = res.scalars().all()
-
-    # Apply same optional filters as list endpoint (excluding pagination)
-    if has_note is not None:
-        def _has_note(p: Paper) -> bool:
-            try:
-                note = (p.extra or {}).get("note", "")
-                return bool(str(note).strip())
-            except Exception:
-                return False
-        rows = [p for p in rows if _has_note(p) == has_note]
-
-    if category:
-        rows = [p for p in rows if (p.primary_category or "") == category]
-
-    if tag:
-        if tag == "empty":
-            rows = [p for p in rows if not ((p.tags or {}).get("list") or [])]
-        else:
-            rows = [p for p in rows if tag in ((p.tags or {}).get("list") or [])]
-
-    if announced_date:
-        rows = [p for p in rows if _announced_date(p.submitted_at) == announced_date]
-
-    if arxiv_id:
-        rows = [p for p in rows if (p.arxiv_id or "") == arxiv_id]
-
-    if query:
-        docs = [(p.id, f"{p.title} {p.abstract}") for p in rows]
-        ranked_ids = set(search_bm25(docs, query))
-        rows = [p for p in rows if p.id in ranked_ids]
-
-    total = len(rows)
-    # Category counts (by primary_category)
-    cat_counts: dict[str, int] = {}
-    tag_counts: dict[str, int] = {}
-    empty_tag_count = 0
-    for p in rows:
-        cat = (p.primary_category or "unknown").strip() or "unknown"
-        cat_counts[cat] = cat_counts.get(cat, 0) + 1
-        tag_list = (p.tags or {}).get("list", []) or []
-        if not tag_list:
-            empty_tag_count += 1
-        for t in tag_list:
-            t = (t or "").strip()
-            if not t:
-                continue
-            tag_counts[t] = tag_counts.get(t, 0) + 1
-
+    dialect = session.get_bind().dialect.name
+    conds = _paper_conds(state, category, arxiv_id) + _extra_conds(dialect, has_note, tag, announced_date)
+    # BM25 ranks every paper of the filtered set (it orders, never drops), so a query
+    # leaves the matched set, and these counts, unchanged: no index is needed.
+    return await _stats_sql(session, conds)
+
+def _tag_values(dialect: str):
+    """Table-valued expansion of tags.list (one row per element, column `value`)."""
+    if dialect == "postgresql":
+        lst = Paper.tags["list"]
+        # NULL (not a scalar) for non-arrays so the set-returning function yields nothing
+        return func.json_array_elements_text(case((func.json_typeof(lst) == "array", lst))).table_valued("value")
+    return func.json_each(Paper.tags, "$.list").table_valued("value")
+
+def _tag_len(dialect: str):
+    if dialect == "postgresql":
+        lst = Paper.tags["list"]
+        return case((func.json_typeof(lst) == "array", func.json_array_length(lst)), else_=0)
+    return func.coalesce(func.json_array_length(Paper.tags, "$.list"), 0)
+
+async def _stats_sql(session: AsyncSession, conds: list) -> dict:
+    dialect = session.get_bind().dialect.name
+    cat = func.coalesce(func.nullif(func.trim(Paper.primary_category), ""), "unknown").label("cat")
+    empty = func.sum(case((_tag_len(dialect) == 0, 1), else_=0))
+    res = await session.execute(select(cat, func.count(), empty).where(*conds).group_by(cat))
+    rows = res.all()
+    cat_counts = {c: n for c, n, _ in rows}
+    empty_tag_count = sum(e for _, _, e in rows)
+
+    tv = _tag_values(dialect)
+    t = func.trim(tv.c.value).label("t")
+    res = await session.execute(
+        select(t, func.count()).select_from(Paper).join(tv, true()).where(*conds, t != "").group_by(t)
+    )
+    tag_counts = {name: n for name, n in res.all()}
     return {
         "ok": True,
-        "total": total,
+        "total": sum(cat_counts.values()),
         "categories": cat_counts,
         "tags": tag_counts,
         "empty_tag_count": empty_tag_count,
     }
 
+async def _paper_or_404(session: AsyncSession, paper_id: int) -> Paper:
+    paper = await session.get(Paper, paper_id)
+    if not paper:
+        raise HTTPException(404, "paper not found")
+    return paper
+
+async def _paper_by_arxiv_or_404(session: AsyncSession, arxiv_id: str, version: Optional[int]) -> Paper:
+    paper = await _get_paper_by_arxiv(session, arxiv_id, version)
+    if not paper:
+        raise HTTPException(404, "paper not found")
+    return paper
+
+_BATCH_COLUMNS = load_only(Paper.id, Paper.title, Paper.abstract, Paper.categories)
+
+def _json_set(dialect: str, col, key: str, value):
+    """SQL expression for `{**(col if it is an object else {}), key: value}`, or None when the
+    dialect has no JSON functions we use."""
+    if dialect == "sqlite":
+        base = case((func.json_type(col) == "object", col), else_=func.json_object())
+        return func.json_set(base, f'$."{key}"', func.json(value))
+    if dialect == "postgresql":
+        obj = cast(col, JSONB)
+        base = case((func.jsonb_typeof(obj) == "object", obj), else_=func.jsonb_build_object())
+        return cast(base.op("||")(func.jsonb_build_object(cast(key, Text), cast(value, JSONB))), JSON)
+    return None
+
+def _signal_update(dialect: str, key: str):
+    """UPDATE setting signals[key] = :value for id = :pid inside the database, so the
+    rest of the blob is neither copied in Python nor overwritten by a stale read."""
+    merged = _json_set(dialect, Paper.signals, key, bindparam("value", type_=JSON))
+    if merged is None:
+        return None
+    return update(Paper).where(Paper.id == bindparam("pid")).values(signals=merged)
+
+def _paper_where(paper_id: Optional[int] = None, arxiv_id: Optional[str] = None, version: Optional[int] = None):
+    """Condition matching one paper: by id, or by arXiv id and version (latest if omitted)."""
+    if paper_id is not None:
+        return Paper.id == paper_id
+    q = select(Paper.id).where(Paper.arxiv_id == arxiv_id)
+    q = q.where(Paper.version == version) if version is not None else q.order_by(Paper.version.desc())
+    return Paper.id == q.limit(1).scalar_subquery()
+
+async def _update_paper(session: AsyncSession, where, **values):
+    """Single UPDATE .. RETURNING (id, version) instead of load, modify and flush; 404 if no row."""
+    stmt = update(Paper).where(where).values(**values).returning(Paper.id, Paper.version)
+    row = (await session.execute(stmt.execution_options(synchronize_session=False))).first()
+    if row is None:
+        raise HTTPException(404, "paper not found")
+    return row
+
+async def _set_json_key(session: AsyncSession, where, column: str, key: str, value):
+    """Set `column[key] = value` for one paper in SQL; returns (id, version). The caller commits."""
+    merged = _json_set(session.get_bind().dialect.name, getattr(Paper, column), key,
+                       bindparam(None, value, type_=JSON))
+    if merged is not None:
+        return await _update_paper(session, where, **{column: merged})
+    paper = (await session.execute(select(Paper).where(where))).scalar_one_or_none()
+    if paper is None:
+        raise HTTPException(404, "paper not found")
+    setattr(paper, column, {**(getattr(paper, column) or {}), key: value})
+    return paper.id, paper.version
+
+def _signal_missing(key: str):
+    """SQL form of `not (signals or {}).get(key)`: absent, null or an empty/falsy JSON value.
+    JSON text of the key: SQLite renders false as 0, Postgres as false."""
+    txt = cast(Paper.signals[key], Text)
+    return or_(txt.is_(None), txt.in_(("null", "false", "0", '""', "[]", "{}")))
+
+async def _store_signals(session: AsyncSession, key: str, items: list) -> None:
+    """Set signals[key] for each (paper, value) pair; the caller commits."""
+    if not items:
+        return
+    stmt = _signal_update(session.get_bind().dialect.name, key)
+    if stmt is None:
+        for paper, value in items:
+            await session.refresh(paper, ["signals"])
+            paper.signals = {**(paper.signals or {}), key: value}
+        return
+    conn = await session.connection()
+    await conn.execute(stmt, [{"pid": paper.id, "value": value} for paper, value in items])
+
+async def _store_signal_chunks(session: AsyncSession, key: str, items: list, chunk: int = 500) -> list:
+    """
+    `_store_signals` in chunks, each under its own SAVEPOINT inside the caller's transaction.
+    A chunk that fails to write is rolled back alone; returns the pairs that were written.
+    """
+    written = []
+    for i in range(0, len(items), chunk):
+        part = items[i:i + chunk]
+        try:
+            async with session.begin_nested():
+                await _store_signals(session, key, part)
+        except DBAPIError:
+            continue
+        written.extend(part)
+    return written
+
+async def _store_signal(session: AsyncSession, paper: Paper, key: str, value) -> None:
+    await _store_signals(session, key, [(paper, value)])
+    await session.commit()
+
+async def _score(session: AsyncSession, paper: Paper, provider: Optional[str]) -> dict:
+    scores = await cached_rubric_score(session, paper.title or "", paper.abstract or "", provider)
+    await _store_signal(session, paper, "rubric", scores)
+    return scores
+
+async def _suggest(session: AsyncSession, paper: Paper, provider: Optional[str]) -> list:
+    suggestions = await cached_suggest_tags(session, paper.title or "", paper.abstract or "", paper.categories or "", provider)
+    await _store_signal(session, paper, "suggested_tags", suggestions)
+    return suggestions
+
+def _manual_rubric(body: RubricSetReq) -> dict:
+    # sanitize values to 1..5
+    def clamp(x: int) -> int:
+        return max(1, min(5, int(x)))
+    scores = {
+        "novelty": clamp(body.novelty),
+        "evidence": clamp(body.evidence),
+        "clarity": clamp(body.clarity),
+        "reusability": clamp(body.reusability),
+        "fit": clamp(body.fit),
+    }
+    scores["total"] = int(body.total) if body.total is not None else sum(scores.values())
+    return scores
+
 @router.post("/papers/{paper_id}/score")
 async def score_paper(
     paper_id: int,
     provider: str | None = Query(None, description="LLM provider: openai|deepseek"),
     session: AsyncSession = Depends(get_session),
 ):
-    res = await session.execute(select(Paper).where(Paper.id == paper_id))
-    paper = res.scalar_one_or_none()
-    if not paper:
-        raise HTTPException(404, "paper not found")
-    scores = llm_rubric_score(paper.title or "", paper.abstract or "", provider=provider)
-    sig = dict(paper.signals or {})
-    sig["rubric"] = scores
-    paper.signals = sig
-    session.add(paper)
-    await session.commit()
+    paper = await _paper_or_404(session, paper_id)
+    scores = await _score(session, paper, provider)
     return {"ok": True, "data": {"paper_id": paper_id, "rubric": scores}}
 
 @router.post("/papers/by_arxiv/{arxiv_id}/score")
@@ -291,15 +455,8 @@ async def score_paper_by_arxiv(
     provider: str | None = Query(None, description="LLM provider: openai|deepseek"),
     session: AsyncSession = Depends(get_session),
 ):
-    paper = await _get_paper_by_arxiv(session, arxiv_id, version)
-    if not paper:
-        raise HTTPException(404, "paper not found")
-    scores = llm_rubric_score(paper.title or "", paper.abstract or "", provider=provider)
-    sig = dict(paper.signals or {})
-    sig["rubric"] = scores
-    paper.signals = sig
-    session.add(paper)
-    await session.commit()
+    paper = await _paper_by_arxiv_or_404(session, arxiv_id, version)
+    scores = await _score(session, paper, provider)
     return {"ok": True, "data": {"arxiv_id": arxiv_id, "version": paper.version, "rubric": scores}}
 
 @router.post("/papers/{paper_id}/suggest-tags")
@@ -308,16 +465,8 @@ async def suggest_tags(
     provider: str | None = Query(None, description="LLM provider: openai|deepseek"),
     session: AsyncSession = Depends(get_session),
 ):
-    res = await session.execute(select(Paper).where(Paper.id == paper_id))
-    paper = res.scalar_one_or_none()
-    if not paper:
-        raise HTTPException(404, "paper not found")
-    suggestions = llm_suggest_tags(paper.title or "", paper.abstract or "", paper.categories or "", provider)
-    sig = dict(paper.signals or {})
-    sig["suggested_tags"] = suggestions
-    paper.signals = sig
-    session.add(paper)
-    await session.commit()
+    paper = await _paper_or_404(session, paper_id)
+    suggestions = await _suggest(session, paper, provider)
     return {"ok": True, "data": {"paper_id": paper_id, "suggested": suggestions}}
 
 @router.post("/papers/by_arxiv/{arxiv_id}/suggest-tags")
@@ -327,15 +476,8 @@ async def suggest_tags_by_arxiv(
     provider: str | None = Query(None, description="LLM provider: openai|deepseek"),
     session: AsyncSession = Depends(get_session),
 ):
-    paper = await _get_paper_by_arxiv(session, arxiv_id, version)
-    if not paper:
-        raise HTTPException(404, "paper not found")
-    suggestions = llm_suggest_tags(paper.title or "", paper.abstract or "", paper.categories or "", provider)
-    sig = dict(paper.signals or {})
-    sig["suggested_tags"] = suggestions
-    paper.signals = sig
-    session.add(paper)
-    await session.commit()
+    paper = await _paper_by_arxiv_or_404(session, arxiv_id, version)
+    suggestions = await _suggest(session, paper, provider)
     return {"ok": True, "data": {"arxiv_id": arxiv_id, "version": paper.version, "suggested": suggestions}}
 
 @router.post("/papers/{paper_id}/rubric", response_model=dict)
@@ -344,25 +486,8 @@ async def set_rubric(
     body: RubricSetReq = Body(...),
     session: AsyncSession = Depends(get_session),
 ):
-    res = await session.execute(select(Paper).where(Paper.id == paper_id))
-    paper = res.scalar_one_or_none()
-    if not paper:
-        raise HTTPException(404, "paper not found")
-    # sanitize values to 1..5
-    def clamp(x: int) -> int:
-        return max(1, min(5, int(x)))
-    scores = {
-        "novelty": clamp(body.novelty),
-        "evidence": clamp(body.evidence),
-        "clarity": clamp(body.clarity),
-        "reusability": clamp(body.reusability),
-        "fit": clamp(body.fit),
-    }
-    scores["total"] = int(body.total) if body.total is not None else sum(scores.values())
-    sig = dict(paper.signals or {})
-    sig["rubric"] = scores
-    paper.signals = sig
-    session.add(paper)
+    scores = _manual_rubric(body)
+    await _set_json_key(session, _paper_where(paper_id), "signals", "rubric", scores)
     await session.commit()
     return {"ok": True, "data": {"paper_id": paper_id, "rubric": scores}}
 
@@ -373,25 +498,10 @@ async def set_rubric_by_arxiv(
     body: RubricSetReq = Body(...),
     session: AsyncSession = Depends(get_session),
 ):
-    paper = await _get_paper_by_arxiv(session, arxiv_id, version)
-    if not paper:
-        raise HTTPException(404, "paper not found")
-    def clamp(x: int) -> int:
-        return max(1, min(5, int(x)))
-    scores = {
-        "novelty": clamp(body.novelty),
-        "evidence": clamp(body.evidence),
-        "clarity": clamp(body.clarity),
-        "reusability": clamp(body.reusability),
-        "fit": clamp(body.fit),
-    }
-    scores["total"] = int(body.total) if body.total is not None else sum(scores.values())
-    sig = dict(paper.signals or {})
-    sig["rubric"] = scores
-    paper.signals = sig
-    session.add(paper)
+    scores = _manual_rubric(body)
+    _, ver = await _set_json_key(session, _paper_where(None, arxiv_id, version), "signals", "rubric", scores)
     await session.commit()
-    return {"ok": True, "data": {"arxiv_id": arxiv_id, "version": paper.version, "rubric": scores}}
+    return {"ok": True, "data": {"arxiv_id": arxiv_id, "version": ver, "rubric": scores}}
 
 @router.get("/papers/histogram_by_day", response_model=PapersHistogram)
 async def histogram_by_day(
@@ -400,256 +510,364 @@ async def histogram_by_day(
     month: Optional[str] = Query(None, description="YYYY-MM; if missing, last 31 days"),
     session: AsyncSession = Depends(get_session),
 ):
-    stmt = select(Paper)
-    if state:
-        if state == "must_read":
-            stmt = stmt.where(or_(Paper.state == "must_read", Paper.state == "shortlist"))
-        else:
-            stmt = stmt.where(Paper.state == state)
-    stmt = stmt.order_by(Paper.arxiv_id.desc(), Paper.version.desc())
-    res = await session.execute(stmt)
-    rows = res.scalars().all()
-
-    if query:
-        docs = [(p.id, f"{p.title} {p.abstract}") for p in rows]
-        matched = set(search_bm25(docs, query))
-        rows = [p for p in rows if p.id in matched]
-
-    from datetime import datetime, timezone, timedelta
-    counts: dict[str, int] = {}
+    conds = _paper_conds(state)
+    day = Paper.announced_date
     if month:
-        # filter to year-month prefix, using announced date derived from submitted_at
-        for p in rows:
-            ad = _announced_date(p.submitted_at)
-            if ad and ad.startswith(month):
-                counts[ad] = counts.get(ad, 0) + 1
+        # year-month prefix of the announced date
+        conds.append(day.startswith(month, autoescape=True))
     else:
         # last 31 days window
-        today = datetime.now(timezone.utc).date()
-        cutoff = today - timedelta(days=31)
-        def _to_date(s: Optional[str]):
-            try:
-                return datetime.fromisoformat(s).date() if s else None
-            except Exception:
-                return None
-        for p in rows:
-            ad = _announced_date(p.submitted_at)
-            d = _to_date(ad)
-            if d and d >= cutoff:
-                day = d.isoformat()
-                counts[day] = counts.get(day, 0) + 1
-
-    return {"ok": True, "counts": counts}
+        cutoff = datetime.now(timezone.utc).date() - timedelta(days=31)
+        conds.append(day >= cutoff.isoformat())
+
+    # As in papers_stats, BM25 never drops a paper, so `query` leaves the counts unchanged
+    res = await session.execute(select(day, func.count()).where(*conds).group_by(day))
+    return {"ok": True, "counts": dict(res.all())}
+
+async def _batch_ids(session: AsyncSession, state: Optional[str], query: Optional[str],
+                     missing: Optional[str], limit: int) -> list:
+    """Ids a batch works on: papers in exactly `state` (optionally only those without
+    signals[missing]), the BM25 top `limit` for `query`, else the newest `limit`."""
+    query = _search_query(query)
+    conds = [Paper.state == state] if state else []
+    if missing:
+        conds.append(_signal_missing(missing))
+    if limit <= 0:
+        return []
+    if query:
+        # Signals change without invalidating the BM25 cache, so that index isn't cached
+        index = await _bm25_index(session, conds, None if missing else ("exact-state", state))
+        return index.search(query, k=limit)
+    stmt = select(Paper.id).where(*conds).order_by(Paper.arxiv_id.desc(), Paper.version.desc()).limit(limit)
+    return (await session.execute(stmt)).scalars().all()
+
+async def _batch_rows(session: AsyncSession, ids: list) -> list:
+    """Rows for `ids` in that order, with only the columns the LLM prompts use
+    (the signal update is done in SQL)."""
+    if not ids:
+        return []
+    res = await session.execute(select(Paper).options(_BATCH_COLUMNS).where(Paper.id.in_(ids)))
+    id_to_p = {p.id: p for p in res.scalars()}
+    return [id_to_p[i] for i in ids if i in id_to_p]
+
+@router.get("/papers/ids", response_model=PaperIds)
+async def paper_ids(
+    state: Optional[str] = Query(None, description="Exact state, as in the batch endpoints"),
+    query: Optional[str] = Query(None, description="Rank by BM25 and keep the top `limit`"),
+    missing: Optional[str] = Query(None, pattern="^(rubric|suggested_tags)$",
+                                   description="Only papers without this signal"),
+    limit: int = Query(20, ge=1, le=1000),
+    session: AsyncSession = Depends(get_session),
+):
+    """Ids the batch endpoints would pick for the same filters, without their payloads."""
+    return {"ok": True, "ids": await _batch_ids(session, state, query, missing, limit)}
 
 @router.post("/papers/score-batch", response_model=BatchScoreResp)
 async def score_batch(body: BatchScoreReq = Body(...), session: AsyncSession = Depends(get_session)):
-    import asyncio
-
-    # Build base query
-    stmt = select(Paper)
-    if body.state:
-        stmt = stmt.where(Paper.state == body.state)
-    stmt = stmt.order_by(Paper.arxiv_id.desc(), Paper.version.desc())
-    res = await session.execute(stmt)
-    rows = res.scalars().all()
-
-    # Optional query filter via BM25
-    if body.query:
-        docs = [(p.id, f"{p.title} {p.abstract}") for p in rows]
-        matched = set(search_bm25(docs, body.query))
-        rows = [p for p in rows if p.id in matched]
-
-    # Filter missing rubric if requested
-    if body.only_missing:
-        rows = [p for p in rows if not ((p.signals or {}).get("rubric"))]
-
-    # Limit
-    rows = rows[: max(0, int(body.limit))]
-
-    scored, failed, ids = 0, 0, []
+    # Same selection as GET /papers/ids (what the CLI batches over)
+    missing = "rubric" if body.only_missing else None
+    ids = await _batch_ids(session, body.state, body.query, missing, int(body.limit))
+    rows = await _batch_rows(session, ids)
+
+    if body.batch_api:
+        batch_id = await _submit_llm_batch(session, "rubric", rows, body.provider)
+        if batch_id:
+            return {"ok": True, "scored": 0, "failed": 0, "ids": [], "batch_id": batch_id}
+
+    failed = 0
+    updates: list[tuple] = []
     delay = max(0, int(body.delay_ms)) / 1000.0
-
-    for p in rows:
-        try:
-            # Offload potentially blocking call
-            scores = await asyncio.to_thread(llm_rubric_score, p.title or "", p.abstract or "", body.provider)
-            sig = dict(p.signals or {})
-            sig["rubric"] = scores
-            p.signals = sig
-            session.add(p)
-            await session.commit()
-            scored += 1
-            ids.append(p.id)
-        except Exception:
+    results = await cached_rubric_score_many(
+        session, [(p.title or "", p.abstract or "") for p in rows], body.provider,
+        concurrency=body.concurrency, delay=delay,
+    )
+    for p, scores in zip(rows, results):
+        if isinstance(scores, BaseException):
             failed += 1
-        if delay:
-            await asyncio.sleep(delay)
+            continue
+        updates.append((p, scores))
+    # One executemany UPDATE per chunk, all committed together
+    written = await _store_signal_chunks(session, "rubric", updates)
+    failed += len(updates) - len(written)
+    scored, ids = len(written), [p.id for p, _ in written]
+    await session.commit()
 
     return {"ok": True, "scored": scored, "failed": failed, "ids": ids}
 
 @router.post("/papers/suggest-tags-batch", response_model=BatchSuggestResp)
 async def suggest_tags_batch(body: BatchSuggestReq = Body(...), session: AsyncSession = Depends(get_session)):
-    import asyncio
-
-    # Build base query
-    stmt = select(Paper)
-    if body.state:
-        stmt = stmt.where(Paper.state == body.state)
-    stmt = stmt.order_by(Paper.arxiv_id.desc(), Paper.version.desc())
-    res = await session.execute(stmt)
-    rows = res.scalars().all()
-
-    # Optional query filter via BM25
-    if body.query:
-        docs = [(p.id, f"{p.title} {p.abstract}") for p in rows]
-        matched = set(search_bm25(docs, body.query))
-        rows = [p for p in rows if p.id in matched]
+    # Same selection as GET /papers/ids (what the CLI batches over)
+    missing = "suggested_tags" if body.only_missing else None
+    ids = await _batch_ids(session, body.state, body.query, missing, int(body.limit))
+    rows = await _batch_rows(session, ids)
+
+    if body.batch_api:
+        batch_id = await _submit_llm_batch(session, "tags", rows, body.provider)
+        if batch_id:
+            return {"ok": True, "suggested": 0, "failed": 0, "ids": [], "batch_id": batch_id}
+
+    failed = 0
+    updates: list[tuple] = []
+    delay = max(0, int(body.delay_ms)) / 1000.0
+    results = await cached_suggest_tags_many(
+        session, [(p.title or "", p.abstract or "", p.categories or "") for p in rows], body.provider,
+        concurrency=body.concurrency, delay=delay,
+    )
+    for p, tags in zip(rows, results):
+        if isinstance(tags, BaseException):
+            failed += 1
+            continue
+        updates.append((p, tags))
+    # One executemany UPDATE per chunk, all committed together
+    written = await _store_signal_chunks(session, "suggested_tags", updates)
+    failed += len(updates) - len(written)
+    suggested, ids = len(written), [p.id for p, _ in written]
+    await session.commit()
 
-    # Filter missing suggestions if requested
-    if body.only_missing:
-        rows = [p for p in rows if not ((p.signals or {}).get("suggested_tags"))]
+    return {"ok": True, "suggested": suggested, "failed": failed, "ids": ids}
 
-    # Limit
-    rows = rows[: max(0, int(body.limit))]
+async def _submit_llm_batch(session: AsyncSession, kind: str, rows: list, provider: Optional[str]) -> Optional[str]:
+    """Submit `rows` as one provider Batch API job and record it; None (use the per-paper
+    calls) when the provider has no batch endpoint or there is nothing to do.
+    Rows already in the LLM cache are written right away and left out of the job."""
+    if kind == "rubric":
+        args = {str(p.id): (p.title or "", p.abstract or "") for p in rows}
+    else:
+        args = {str(p.id): (p.title or "", p.abstract or "", p.categories or "") for p in rows}
+    keys = {cid: llm_cache.item_key(kind, provider, *a) for cid, a in args.items()}
+    if llm_cache.enabled():
+        hits = await llm_cache._get_many(session, list(keys.values()))
+        cached = [(p, hits[keys[str(p.id)]]) for p in rows if keys[str(p.id)] in hits]
+        if cached:
+            await _store_signal_chunks(session, "rubric" if kind == "rubric" else "suggested_tags", cached)
+            await session.commit()
+            args = {cid: a for cid, a in args.items() if keys[cid] not in hits}
+            keys = {cid: keys[cid] for cid in args}
+    if not args:
+        return None
+    try:
+        batch_id = await asyncio.to_thread(submit_batch, kind, args, provider)
+    except Exception as e:
+        raise HTTPException(502, f"batch submit failed: {e}")
+    if batch_id is None:
+        return None
+    session.add(LLMBatch(batch_id=batch_id, kind=kind, provider=provider, items=keys))
+    await session.commit()
+    return batch_id
+
+@router.post("/papers/llm-batches/{batch_id}/poll", response_model=LLMBatchPoll)
+async def poll_llm_batch(batch_id: str, session: AsyncSession = Depends(get_session)):
+    """Check a Batch API job; once it completed, write its results to the papers' signals
+    (and the LLM cache) like the per-paper batch endpoints do."""
+    res = await session.execute(select(LLMBatch).where(LLMBatch.batch_id == batch_id))
+    job = res.scalar_one_or_none()
+    if job is None:
+        raise HTTPException(404, "batch not found")
+    if job.status == "done":
+        return {"ok": True, "status": job.status}
+    try:
+        status, results = await asyncio.to_thread(batch_results, job.batch_id, job.kind, job.provider)
+    except Exception as e:
+        raise HTTPException(502, f"batch poll failed: {e}")
+    if results is None:
+        job.status = status
+        await session.commit()
+        return {"ok": True, "status": status}
+
+    ids = [int(cid) for cid in results if cid in job.items]
+    res = await session.execute(select(Paper).options(load_only(Paper.id)).where(Paper.id.in_(ids)))
+    signal = "rubric" if job.kind == "rubric" else "suggested_tags"
+    written = await _store_signal_chunks(session, signal, [(p, results[str(p.id)]) for p in res.scalars()])
+    if llm_cache.enabled():
+        await llm_cache.put_many(session, {job.items[cid]: v for cid, v in results.items() if cid in job.items})
+    job.status = "done"
+    await session.commit()
+    return {"ok": True, "status": job.status, "written": len(written),
+            "failed": len(job.items) - len(written), "ids": [p.id for p, _ in written]}
 
-    suggested, failed, ids = 0, 0, []
-    delay = max(0, int(body.delay_ms)) / 1000.0
+_VALID_STATES: frozenset[str] = frozenset(s.value for s in PaperState)
 
-    for p in rows:
-        try:
-            tags = await asyncio.to_thread(llm_suggest_tags, p.title or "", p.abstract or "", p.categories or "", body.provider)
-            sig = dict(p.signals or {})
-            sig["suggested_tags"] = tags
-            p.signals = sig
-            session.add(p)
-            await session.commit()
-            suggested += 1
-            ids.append(p.id)
-        except Exception:
-            failed += 1
-        if delay:
-            await asyncio.sleep(delay)
+def _check_state(state: str) -> None:
+    if state not in _VALID_STATES:
+        raise HTTPException(400, "invalid state")
 
-    return {"ok": True, "suggested": suggested, "failed": failed, "ids": ids}
+async def _set_state(session: AsyncSession, where, state: str) -> int:
+    pid, ver = await _update_paper(session, where, state=state)
+    session.add(Action(paper_id=pid, action="set_state", payload={"state": state}, actor="nan"))
+    await session.commit()
+    _invalidate_caches()
+    return ver
 
 @router.post("/papers/{paper_id}/state")
 async def set_state(paper_id: int, body: SetStateReq, session: AsyncSession = Depends(get_session)):
-    if body.state not in [s.value for s in PaperState]:
-        raise HTTPException(400, "invalid state")
-    res = await session.execute(select(Paper).where(Paper.id == paper_id))
-    paper = res.scalar_one_or_none()
-    if not paper:
-        raise HTTPException(404, "paper not found")
-    paper.state = body.state
-    session.add(paper)
-    session.add(Action(paper_id=paper_id, action="set_state", payload={"state": body.state}, actor="nan"))
-    await session.commit()
+    _check_state(body.state)
+    await _set_state(session, _paper_where(paper_id), body.state)
     return {"ok": True, "data": {"paper_id": paper_id, "state": body.state}}
 
 @router.post("/papers/by_arxiv/{arxiv_id}/state")
 async def set_state_by_arxiv(arxiv_id: str, version: Optional[int] = Query(None), body: SetStateReq = Body(...), session: AsyncSession = Depends(get_session)):
-    if body.state not in [s.value for s in PaperState]:
-        raise HTTPException(400, "invalid state")
-    paper = await _get_paper_by_arxiv(session, arxiv_id, version)
-    if not paper:
-        raise HTTPException(404, "paper not found")
-    paper.state = body.state
-    session.add(paper)
-    session.add(Action(paper_id=paper.id, action="set_state", payload={"state": body.state}, actor="nan"))
+    _check_state(body.state)
+    ver = await _set_state(session, _paper_where(None, arxiv_id, version), body.state)
+    return {"ok": True, "data": {"arxiv_id": arxiv_id, "version": ver, "state": body.state}}
+
+@router.post("/papers/bulk-state")
+async def bulk_state(body: BulkStateReq, session: AsyncSession = Depends(get_session)):
+    """Set the same state on many papers with one UPDATE (+ one multi-row Action insert)."""
+    _check_state(body.state)
+    ids = sorted(set(body.ids))
+    if not ids:
+        return {"ok": True, "updated": 0}
+    res = await session.execute(update(Paper).where(Paper.id.in_(ids)).values(state=body.state).returning(Paper.id))
+    updated = res.scalars().all()
+    if updated:
+        await session.execute(
+            insert(Action),
+            [{"paper_id": i, "action": "set_state", "payload": {"state": body.state}, "actor": "nan"} for i in updated],
+        )
+    await session.commit()
+    _invalidate_caches()
+    return {"ok": True, "updated": len(updated)}
+
+def _apply_tags(paper: Paper, add: Optional[List[str]], remove: Optional[List[str]]) -> None:
+    # Stored lists are kept sorted and unique, so only the additions need sorting
+    cur = list((paper.tags or {}).get("list", []))
+    if any(a >= b for a, b in zip(cur, cur[1:])):
+        cur = sorted(set(cur))  # legacy/externally written lists
+    new = sorted(set(add or ()).difference(cur))
+    drop = set(remove or ())
+    paper.tags = {"list": [t for t in heapq.merge(cur, new) if t not in drop]}
+
+def _tags_merge(dialect: str, add: Optional[List[str]], remove: Optional[List[str]]):
+    """SQL form of `_apply_tags` (sorted union of tags.list and `add`, minus `remove`), so a
+    tag edit is one atomic UPDATE instead of a read-modify-write; None for other dialects."""
+    if dialect == "sqlite":
+        elements = func.json_each
+        cur = func.json_each(Paper.tags, "$.list").table_valued("value")
+    elif dialect == "postgresql":
+        elements = func.json_array_elements_text
+        cur = _tag_values(dialect)
+    else:
+        return None
+    added = elements(bindparam(None, list(add or ()), type_=JSON)).table_valued("value")
+    removed = elements(bindparam(None, list(remove or ()), type_=JSON)).table_valued("value")
+    vals = union(select(cur.c.value), select(added.c.value)).subquery()
+    keep = vals.c.value.not_in(select(removed.c.value))
+    if dialect == "sqlite":
+        # No ORDER BY inside aggregates before SQLite 3.44; an ordered subquery is aggregated in order
+        kept = select(vals.c.value).where(keep).order_by(vals.c.value).subquery()
+        lst = select(func.json_group_array(kept.c.value)).scalar_subquery()
+        return func.json_object("list", func.json(lst))
+    # "C" collation orders by code point, like Python's sorted()
+    agg = func.json_agg(aggregate_order_by(vals.c.value, vals.c.value.collate("C")))
+    lst = select(func.coalesce(agg, func.json_build_array())).where(keep).scalar_subquery()
+    return func.json_build_object(cast("list", Text), lst)
+
+@router.post("/papers/bulk-tags")
+async def bulk_tags(body: BulkTagsReq, session: AsyncSession = Depends(get_session)):
+    """Apply the same tag add/remove to many papers in a single transaction."""
+    ids = sorted(set(body.ids))
+    if not ids:
+        return {"ok": True, "updated": 0}
+    merged = _tags_merge(session.get_bind().dialect.name, body.add, body.remove)
+    if merged is not None:
+        stmt = update(Paper).where(Paper.id.in_(ids)).values(tags=merged).returning(Paper.id, Paper.tags)
+        rows = (await session.execute(stmt.execution_options(synchronize_session=False))).all()
+    else:
+        res = await session.execute(select(Paper).options(load_only(Paper.id, Paper.tags)).where(Paper.id.in_(ids)))
+        rows = []
+        for paper in res.scalars():
+            _apply_tags(paper, body.add, body.remove)
+            rows.append((paper.id, paper.tags))
+    if rows:
+        await session.execute(
+            insert(Action),
+            [{"paper_id": pid, "action": "tags", "payload": t, "actor": "nan"} for pid, t in rows],
+        )
     await session.commit()
-    return {"ok": True, "data": {"arxiv_id": arxiv_id, "version": paper.version, "state": body.state}}
+    return {"ok": True, "updated": len(rows)}
+
+async def _set_tags(session: AsyncSession, where, body: TagsReq) -> tuple:
+    """Apply the add/remove to one paper and commit; returns (version, tags)."""
+    merged = _tags_merge(session.get_bind().dialect.name, body.add, body.remove)
+    if merged is not None:
+        stmt = update(Paper).where(where).values(tags=merged).returning(Paper.id, Paper.version, Paper.tags)
+        row = (await session.execute(stmt.execution_options(synchronize_session=False))).first()
+        if row is None:
+            raise HTTPException(404, "paper not found")
+        pid, ver, tags = row
+    else:
+        paper = (await session.execute(select(Paper).where(where))).scalar_one_or_none()
+        if paper is None:
+            raise HTTPException(404, "paper not found")
+        _apply_tags(paper, body.add, body.remove)
+        pid, ver, tags = paper.id, paper.version, paper.tags
+    session.add(Action(paper_id=pid, action="tags", payload=tags, actor="nan"))
+    await session.commit()
+    return ver, tags
 
 @router.post("/papers/{paper_id}/tags")
 async def tags(paper_id: int, body: TagsReq, session: AsyncSession = Depends(get_session)):
-    res = await session.execute(select(Paper).where(Paper.id == paper_id))
-    paper = res.scalar_one_or_none()
-    if not paper:
-        raise HTTPException(404, "paper not found")
-    tags = set((paper.tags or {}).get("list", []))
-    if body.add:
-        tags.update(body.add)
-    if body.remove:
-        tags.difference_update(body.remove)
-    paper.tags = {"list": sorted(tags)}
-    session.add(paper)
-    session.add(Action(paper_id=paper_id, action="tags", payload=paper.tags, actor="nan"))
-    await session.commit()
-    return {"ok": True, "data": {"paper_id": paper_id, "tags": paper.tags}}
+    _, tags = await _set_tags(session, _paper_where(paper_id), body)
+    return {"ok": True, "data": {"paper_id": paper_id, "tags": tags}}
 
 @router.post("/papers/by_arxiv/{arxiv_id}/tags")
 async def tags_by_arxiv(arxiv_id: str, version: Optional[int] = Query(None), body: TagsReq = Body(...), session: AsyncSession = Depends(get_session)):
-    paper = await _get_paper_by_arxiv(session, arxiv_id, version)
-    if not paper:
-        raise HTTPException(404, "paper not found")
-    tags = set((paper.tags or {}).get("list", []))
-    if body.add:
-        tags.update(body.add)
-    if body.remove:
-        tags.difference_update(body.remove)
-    paper.tags = {"list": sorted(tags)}
-    session.add(paper)
-    session.add(Action(paper_id=paper.id, action="tags", payload=paper.tags, actor="nan"))
+    ver, tags = await _set_tags(session, _paper_where(None, arxiv_id, version), body)
+    return {"ok": True, "data": {"arxiv_id": arxiv_id, "version": ver, "tags": tags}}
+
+async def _set_note(session: AsyncSession, where, body: dict) -> tuple:
+    note_text = (body or {}).get("body", "")
+    pid, ver = await _set_json_key(session, where, "extra", "note", note_text)
+    session.add(Action(paper_id=pid, action="note", payload={"len": len(note_text)}, actor="nan"))
     await session.commit()
-    return {"ok": True, "data": {"arxiv_id": arxiv_id, "version": paper.version, "tags": paper.tags}}
+    return note_text, ver
 
 @router.post("/papers/{paper_id}/note")
 async def set_note(paper_id: int, body: dict = Body(...), session: AsyncSession = Depends(get_session)):
-    res = await session.execute(select(Paper).where(Paper.id == paper_id))
-    paper = res.scalar_one_or_none()
-    if not paper:
-        raise HTTPException(404, "paper not found")
-    note_text = (body or {}).get("body", "")
-    ext = dict(paper.extra or {})
-    ext["note"] = note_text
-    paper.extra = ext
-    session.add(paper)
-    session.add(Action(paper_id=paper.id, action="note", payload={"len": len(note_text)}, actor="nan"))
-    await session.commit()
+    note_text, _ = await _set_note(session, _paper_where(paper_id), body)
     return {"ok": True, "data": {"paper_id": paper_id, "note": note_text}}
 
 @router.post("/papers/by_arxiv/{arxiv_id}/note")
 async def set_note_by_arxiv(arxiv_id: str, version: Optional[int] = Query(None), body: dict = Body(...), session: AsyncSession = Depends(get_session)):
-    paper = await _get_paper_by_arxiv(session, arxiv_id, version)
-    if not paper:
-        raise HTTPException(404, "paper not found")
-    note_text = (body or {}).get("body", "")
-    ext = dict(paper.extra or {})
-    ext["note"] = note_text
-    paper.extra = ext
-    session.add(paper)
-    session.add(Action(paper_id=paper.id, action="note", payload={"len": len(note_text)}, actor="nan"))
-    await session.commit()
-    return {"ok": True, "data": {"arxiv_id": arxiv_id, "version": paper.version, "note": note_text}}
+    note_text, ver = await _set_note(session, _paper_where(None, arxiv_id, version), body)
+    return {"ok": True, "data": {"arxiv_id": arxiv_id, "version": ver, "note": note_text}}
 
-@router.get("/papers/{paper_id}/pdf")
-async def get_pdf(paper_id: int, session: AsyncSession = Depends(get_session)):
-    res = await session.execute(select(Paper).where(Paper.id == paper_id))
-    paper = res.scalar_one_or_none()
-    if not paper:
-        raise HTTPException(404, "paper not found")
+def _http(request: Request) -> httpx.AsyncClient:
+    # Shared client created in the app lifespan
+    return request.app.state.http
+
+async def _proxy_pdf(paper: Paper, client: httpx.AsyncClient):
     url = paper.links_pdf or (f"https://arxiv.org/pdf/{paper.arxiv_id}.pdf" if paper.arxiv_id else None)
     if not url:
         raise HTTPException(404, "pdf url not available")
     try:
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-            upstream = await client.get(url)
-            upstream.raise_for_status()
-            headers = {"Content-Type": "application/pdf", "Cache-Control": "public, max-age=86400"}
-            return StreamingResponse(iter([upstream.content]), media_type="application/pdf", headers=headers)
+        # Headers only; the body is relayed chunk by chunk instead of buffered
+        upstream = await client.send(client.build_request("GET", url), stream=True)
     except httpx.HTTPError as e:
         raise HTTPException(502, f"failed to fetch pdf: {e}")
-
-@router.get("/papers/by_arxiv/{arxiv_id}/pdf")
-async def get_pdf_by_arxiv(arxiv_id: str, version: Optional[int] = Query(None), session: AsyncSession = Depends(get_session)):
-    paper = await _get_paper_by_arxiv(session, arxiv_id, version)
-    if not paper:
-        raise HTTPException(404, "paper not found")
-    url = paper.links_pdf or f"https://arxiv.org/pdf/{paper.arxiv_id}.pdf"
     try:
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-            upstream = await client.get(url)
-            upstream.raise_for_status()
-            headers = {"Content-Type": "application/pdf", "Cache-Control": "public, max-age=86400"}
-            return StreamingResponse(iter([upstream.content]), media_type="application/pdf", headers=headers)
+        upstream.raise_for_status()
     except httpx.HTTPError as e:
+        await upstream.aclose()
         raise HTTPException(502, f"failed to fetch pdf: {e}")
+
+    async def body():
+        try:
+            async for chunk in upstream.aiter_bytes(65536):
+                yield chunk
+        finally:
+            await upstream.aclose()
+
+    headers = {"Content-Type": "application/pdf", "Cache-Control": "public, max-age=86400"}
+    if "content-length" in upstream.headers and "content-encoding" not in upstream.headers:
+        headers["Content-Length"] = upstream.headers["content-length"]
+    return StreamingResponse(body(), media_type="application/pdf", headers=headers)
+
+@router.get("/papers/{paper_id}/pdf")
+async def get_pdf(paper_id: int, session: AsyncSession = Depends(get_session), client: httpx.AsyncClient = Depends(_http)):
+    return await _proxy_pdf(await _paper_or_404(session, paper_id), client)
+
+@router.get("/papers/by_arxiv/{arxiv_id}/pdf")
+async def get_pdf_by_arxiv(arxiv_id: str, version: Optional[int] = Query(None), session: AsyncSession = Depends(get_session),
+                           client: httpx.AsyncClient = Depends(_http)):
+    return await _proxy_pdf(await _paper_by_arxiv_or_404(session, arxiv_id, version), client)
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 
 class PaperOut(BaseModel):
@@ -27,6 +27,7 @@ class PapersResponse(BaseModel):
     ok: bool = True
     data: List[PaperOut]
     total: int
+    next_cursor: Optional[str] = None
 
 class PapersStats(BaseModel):
     ok: bool = True
@@ -42,12 +43,20 @@ class BatchScoreReq(BaseModel):
     only_missing: bool = True
     query: Optional[str] = None
     delay_ms: int = 800
+    # LLM calls in flight; delay_ms paces starts after the first burst
+    concurrency: int = Field(8, ge=1, le=32)
+    batch_api: bool = False  # submit one provider Batch API job instead (poll /papers/llm-batches/{id})
 
 class BatchScoreResp(BaseModel):
     ok: bool = True
     scored: int
     failed: int
     ids: List[int]
+    batch_id: Optional[str] = None
+
+class PaperIds(BaseModel):
+    ok: bool = True
+    ids: List[int]
 
 class PapersHistogram(BaseModel):
     ok: bool = True
@@ -76,16 +85,36 @@ class BatchSuggestReq(BaseModel):
     only_missing: bool = True
     query: Optional[str] = None
     delay_ms: int = 800
+    # LLM calls in flight; delay_ms paces starts after the first burst
+    concurrency: int = Field(8, ge=1, le=32)
+    batch_api: bool = False  # submit one provider Batch API job instead (poll /papers/llm-batches/{id})
 
 class BatchSuggestResp(BaseModel):
     ok: bool = True
     suggested: int
     failed: int
     ids: List[int]
+    batch_id: Optional[str] = None
+
+class LLMBatchPoll(BaseModel):
+    ok: bool = True
+    status: str
+    written: int = 0
+    failed: int = 0
+    ids: List[int] = []
 
 class SetStateReq(BaseModel):
     state: str
 
+class BulkStateReq(BaseModel):
+    ids: List[int]
+    state: str
+
+class BulkTagsReq(BaseModel):
+    ids: List[int]
+    add: Optional[List[str]] = None
+    remove: Optional[List[str]] = None
+
 class NoteReq(BaseModel):
     body: str
 
@@ -1,18 +1,178 @@
-import httpx, asyncio, time, re
+import httpx, asyncio, time, re, hashlib
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from typing import List, Dict, Any, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from datetime import datetime, timezone, timedelta
-from ..models import Paper
+from ..models import Paper, ConfigKV
 from ..db import get_session
+from .announce import announced_date, next_mailing, parse_timestamp
+from .scoring import BM25_CACHE
 import yaml, os
-from dateutil import parser as dtp
+import xml.etree.ElementTree as ET
 from loguru import logger
 
 ARXIV_BASE = "https://export.arxiv.org/api/query"
+# Parsed fetch_arxiv results per (cats, days, max_results) → (monotonic expiry, papers).
+# The feed only changes at a mailing, so entries live until the next one (at most a day).
+_FETCH_CACHE: "OrderedDict[tuple, tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+FETCH_CACHE_TTL = 24 * 3600
+FETCH_CACHE_MAXSIZE = 32
+# Bytes handed to the XML parser per worker-thread hop
+_PARSE_CHUNK = 64 * 1024
+# Rows per upsert statement, well under SQLite's bound-parameter limit
+_UPSERT_CHUNK = 500
+
+_ATOM = "{http://www.w3.org/2005/Atom}"
+_AUTHOR_NAME_PATH = f"{_ATOM}author/{_ATOM}name"
+_ABS_ID_RE = re.compile(r"/abs/(\d{4}\.\d{4,5})(v(\d+))?")
+
+def _text(entry: ET.Element, tag: str) -> Optional[str]:
+    t = entry.findtext(_ATOM + tag)
+    return t.strip() if t is not None else None
+
+def _feed_atom(parser: ET.XMLPullParser, chunk: Optional[bytes], cutoff: Optional[datetime],
+               stats: Dict[str, int]) -> List[Dict[str, Any]]:
+    # Parse one chunk (None: end of feed) and convert the entries it completed
+    if chunk is None:
+        parser.close()  # raises on a truncated feed
+    else:
+        parser.feed(chunk)
+    out = []
+    for _, el in parser.read_events():
+        if el.tag == _ATOM + "entry":
+            stats["seen"] += 1
+            p = _parse_atom_entry(el, cutoff)
+            if p is not None:
+                out.append(p)
+            el.clear()
+    return out
+
+@asynccontextmanager
+async def _client_or_new(client: Optional[httpx.AsyncClient], timeout: float):
+    # The app's shared client when the caller has one, else a one-off
+    if client is not None:
+        yield client
+    else:
+        async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as own:
+            yield own
+
+async def _atom_papers(params: Dict[str, Any], validators: Optional[Dict[str, str]] = None,
+                       cutoff: Optional[datetime] = None, stats: Optional[Dict[str, int]] = None,
+                       client: Optional[httpx.AsyncClient] = None):
+    """
+    GET the Atom API and yield its entries as Paper dicts while the body streams in, so
+    neither the whole text nor a split copy of it is held. Parsing runs in a worker
+    thread a chunk at a time, keeping the event loop free for other requests.
+
+    `validators` ({"etag", "last_modified"} from an earlier response) turns this into a
+    conditional GET: a 304 yields nothing, and the dict is updated from a 200's headers.
+    With `cutoff`, only entries published or updated since then are yielded; `stats`
+    ("seen") counts every entry in the feed.
+    """
+    stats = stats if stats is not None else {}
+    stats.setdefault("seen", 0)
+    headers = {"User-Agent": "arxiv-news-agent/0.1 (github.com/you)"}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+    parser = ET.XMLPullParser(["end"])
+    async with _client_or_new(client, 30.0) as client:
+        logger.debug(f"arXiv request params: {params}")
+        async with client.stream("GET", ARXIV_BASE, params=params, headers=headers, timeout=30.0) as resp:
+            if resp.status_code == 304:
+                logger.info(f"arXiv feed unchanged since last fetch: {resp.url}")
+                return
+            resp.raise_for_status()
+            if validators is not None:
+                validators.clear()
+                validators.update({k: v for k, v in (("etag", resp.headers.get("ETag")),
+                                                     ("last_modified", resp.headers.get("Last-Modified"))) if v})
+            logger.debug(f"arXiv response from {resp.url}")
+            async for chunk in resp.aiter_bytes(_PARSE_CHUNK):
+                for p in await asyncio.to_thread(_feed_atom, parser, chunk, cutoff, stats):
+                    yield p
+    for p in await asyncio.to_thread(_feed_atom, parser, None, cutoff, stats):
+        yield p
+
+def _parse_atom_dates(published: Optional[str], updated: Optional[str]):
+    """(published, updated) as aware UTC datetimes; both None if either is malformed."""
+    try:
+        pub_dt = parse_timestamp(published) if published else None
+        upd_dt = parse_timestamp(updated) if updated else None
+    except Exception:
+        return None, None
+
+    def _to_utc(dt):
+        if not dt:
+            return None
+        if dt.tzinfo is None:
+            return dt.replace(tzinfo=timezone.utc)
+        return dt.astimezone(timezone.utc)
+
+    return _to_utc(pub_dt), _to_utc(upd_dt)
+
+def _parse_atom_entry(e: ET.Element, cutoff: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+    """One Atom <entry> as a Paper dict; None if it has no arXiv abs id, or if `cutoff`
+    is given and neither its published nor updated time is at or after it."""
+    # id example: http://arxiv.org/abs/2509.01234v2
+    m = _ABS_ID_RE.search(_text(e, "id") or "")
+    if not m:
+        return None
+    pub_dt_utc, upd_dt_utc = _parse_atom_dates(_text(e, "published"), _text(e, "updated"))
+    # window filter first, so entries outside it skip the remaining fields
+    if cutoff is not None and not ((pub_dt_utc and pub_dt_utc >= cutoff) or (upd_dt_utc and upd_dt_utc >= cutoff)):
+        return None
+    arxiv_id = m.group(1)
+    version = int(m.group(3) or "1")
+    title = (_text(e, "title") or "").replace("\n", " ").strip()
+    abstract = (_text(e, "summary") or "").replace("\n", " ").strip()
+
+    # categories
+    cats = [c.get("term") for c in e.iter(_ATOM + "category") if c.get("term")]
+    primary_cat = cats[0] if cats else "unknown"
+
+    # authors
+    authors = ", ".join(n.text or "" for n in e.iterfind(_AUTHOR_NAME_PATH))
+
+    # links
+    pdf_link = None
+    html_abs = None
+    for link in e.findall(_ATOM + "link"):
+        href, rel, _type = link.get("href"), link.get("rel"), link.get("type")
+        if rel == "alternate":
+            html_abs = href
+        if rel == "related" and (_type or "").endswith("pdf"):
+            pdf_link = href
+    if not pdf_link:
+        # common pattern
+        pdf_link = f"https://arxiv.org/pdf/{arxiv_id}.pdf"
+    if not html_abs:
+        html_abs = f"https://arxiv.org/abs/{arxiv_id}"
+
+    return {
+        "arxiv_id": arxiv_id,
+        "version": version,
+        "title": title,
+        "abstract": abstract,
+        "authors": authors,
+        "categories": ",".join(cats),
+        "primary_category": primary_cat,
+        "submitted_at": pub_dt_utc.isoformat() if pub_dt_utc else None,
+        "updated_at": upd_dt_utc.isoformat() if upd_dt_utc else None,
+        "links_pdf": pdf_link,
+        "links_abs": html_abs,
+        "links_html": f"https://ar5iv.org/html/{arxiv_id}",
+        "extra": {}
+    }
 
 def parse_date_only(s: str):
-    return dtp.parse(s).date()
+    return parse_timestamp(s).date()
 
 def _load_cfg_default():
     path = os.path.join(os.getcwd(), "config.yaml")
@@ -47,10 +207,21 @@ def _env_or_cfg_max_results(cfg) -> int:
         return int(d)
     return int(cfg.get("sources", {}).get("max_results", 200))
 
-async def fetch_arxiv(cats: List[str], days: int, max_results: int) -> List[Dict[str, Any]]:
+async def fetch_arxiv(cats: List[str], days: int, max_results: int,
+                      validators: Optional[Dict[str, str]] = None,
+                      client: Optional[httpx.AsyncClient] = None) -> List[Dict[str, Any]]:
     """
     Query arXiv Atom API for given categories within a recency window.
+    With `validators` the request is conditional (see `_atom_papers`); an unchanged
+    feed returns []. Repeats of a query before the next mailing are served from memory.
+    `client`, e.g. the app's shared one, reuses its pooled connections.
     """
+    key = (tuple(sorted(cats)), days, max_results)
+    hit = _FETCH_CACHE.get(key)
+    if hit and time.monotonic() < hit[0]:
+        _FETCH_CACHE.move_to_end(key)
+        logger.debug(f"arXiv query served from cache: {key}")
+        return list(hit[1])
     # Build query (use spaces so httpx encodes them as '+').
     # Parenthesize OR to be safe with precedence.
     cat_query = " OR ".join([f"cat:{c}" for c in cats])
@@ -66,185 +237,85 @@ async def fetch_arxiv(cats: List[str], days: int, max_results: int) -> List[Dict
         "max_results": max_results
     }
     # etiquette: one request per ~3s
-    # async with httpx.AsyncClient(timeout=30.0) as client:
-    async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-        logger.debug(f"arXiv request params: {params}")
-        resp = await client.get(ARXIV_BASE, params=params, headers={"User-Agent": "arxiv-news-agent/0.1 (github.com/you)"})
-        resp.raise_for_status()
-        text = resp.text
-    print(resp.url)
-
-    # Manual parse: basic fields using regex (avoid adding feedparser at runtime)
-    # (You can swap to feedparser if you prefer.)
-    entries = text.split("<entry>")[1:]
-    results = []
+    # Stdlib pull parser over the streamed feed (avoid adding feedparser at runtime)
     now = datetime.now(timezone.utc)
     cutoff = now - timedelta(days=days)
     logger.debug(f"now_utc={now.isoformat()} cutoff_utc={cutoff.isoformat()} window_days={days}")
-    kept, total = 0, 0
-    sample_times = []
-    for e in entries:
-        def _get(tag):
-            m = re.search(rf"<{tag}[^>]*>(.*?)</{tag}>", e, re.DOTALL)
-            return (m.group(1).strip() if m else None)
-        arxiv_id_full = _get("id") or ""
-        # print(arxiv_id_full)
-        # id example: http://arxiv.org/abs/2509.01234v2
-        m = re.search(r"/abs/(\d{4}\.\d{4,5})(v(\d+))?", arxiv_id_full)
-        if not m:
-            continue
-        arxiv_id = m.group(1)
-        version = int(m.group(3) or "1")
-        title = (_get("title") or "").replace("\n", " ").strip()
-        abstract = (_get("summary") or "").replace("\n", " ").strip()
-        published = _get("published")
-        updated = _get("updated")
-        try:
-            pub_dt = dtp.parse(published) if published else None
-            upd_dt = dtp.parse(updated) if updated else None
-        except Exception:
-            pub_dt = upd_dt = None
-
-        def _to_utc(dt):
-            if not dt:
-                return None
-            if dt.tzinfo is None:
-                return dt.replace(tzinfo=timezone.utc)
-            return dt.astimezone(timezone.utc)
-
-        pub_dt_utc = _to_utc(pub_dt)
-        upd_dt_utc = _to_utc(upd_dt)
-
-        # window filter: include if either published or updated within window
-        total += 1
-        if not ((pub_dt_utc and pub_dt_utc >= cutoff) or (upd_dt_utc and upd_dt_utc >= cutoff)):
-            continue
-        kept += 1
-        if pub_dt_utc or upd_dt_utc:
-            sample_times.append((pub_dt_utc.isoformat() if pub_dt_utc else None, upd_dt_utc.isoformat() if upd_dt_utc else None))
-
-        # categories
-        cats = re.findall(r'<category term="(.*?)"', e) or []
-        primary_cat = cats[0] if cats else "unknown"
-
-        # authors
-        authors = ", ".join(re.findall(r"<name>(.*?)</name>", e))
-
-        # links
-        pdf_link = None
-        html_abs = None
-        for href, rel, _type in re.findall(r'<link href="(.*?)" rel="(.*?)"(?: type="(.*?)")?/?', e):
-            if rel == "alternate":
-                html_abs = href
-            if rel == "related" and (_type or "").endswith("pdf"):
-                pdf_link = href
-        if not pdf_link:
-            # common pattern
-            pdf_link = f"https://arxiv.org/pdf/{arxiv_id}.pdf"
-        if not html_abs:
-            html_abs = f"https://arxiv.org/abs/{arxiv_id}"
-
-        results.append({
-            "arxiv_id": arxiv_id,
-            "version": version,
-            "title": title,
-            "abstract": abstract,
-            "authors": authors,
-            "categories": ",".join(cats),
-            "primary_category": primary_cat,
-            "submitted_at": pub_dt_utc.isoformat() if pub_dt_utc else None,
-            "updated_at": upd_dt_utc.isoformat() if upd_dt_utc else None,
-            "links_pdf": pdf_link,
-            "links_abs": html_abs,
-            "links_html": f"https://ar5iv.org/html/{arxiv_id}",
-            "extra": {}
-        })
-    logger.info(f"Fetched {len(results)} entries from arXiv (total_seen={total}, kept_after_window={kept})")
+    stats = {"seen": 0}
+    # window filter (published or updated within window) is applied by the parser
+    results = [p async for p in _atom_papers(params, validators, cutoff, stats, client)]
+    sample_times = [(p["submitted_at"], p["updated_at"]) for p in results]
+    logger.info(f"Fetched {len(results)} entries from arXiv (total_seen={stats['seen']}, kept_after_window={len(results)})")
     if sample_times:
         head = sample_times[:5]
         logger.debug(f"sample published/updated (utc): {head}")
-    return results
+    until_mailing = (next_mailing(now) - now).total_seconds()
+    _FETCH_CACHE[key] = (time.monotonic() + min(FETCH_CACHE_TTL, until_mailing), results)
+    _FETCH_CACHE.move_to_end(key)
+    while len(_FETCH_CACHE) > FETCH_CACHE_MAXSIZE:
+        _FETCH_CACHE.popitem(last=False)
+    return list(results)
 
-async def fetch_arxiv_by_ids(ids: List[str]) -> List[Dict[str, Any]]:
+async def fetch_arxiv_by_ids(ids: List[str], client: Optional[httpx.AsyncClient] = None) -> List[Dict[str, Any]]:
     if not ids:
         return []
     params = {
         "id_list": ",".join(ids)
     }
-    async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-        logger.debug(f"arXiv request by id params: {params}")
-        resp = await client.get(ARXIV_BASE, params=params, headers={"User-Agent": "arxiv-news-agent/0.1 (github.com/you)"})
-        resp.raise_for_status()
-        text = resp.text
-    entries = text.split("<entry>")[1:]
-    out: List[Dict[str, Any]] = []
-    for e in entries:
-        def _get(tag):
-            m = re.search(rf"<{tag}[^>]*>(.*?)</{tag}>", e, re.DOTALL)
-            return (m.group(1).strip() if m else None)
-        arxiv_id_full = _get("id") or ""
-        m = re.search(r"/abs/(\d{4}\.\d{4,5})(v(\d+))?", arxiv_id_full)
-        if not m:
-            continue
-        arxiv_id = m.group(1)
-        version = int(m.group(3) or "1")
-        title = (_get("title") or "").replace("\n", " ").strip()
-        abstract = (_get("summary") or "").replace("\n", " ").strip()
-        published = _get("published")
-        updated = _get("updated")
-        try:
-            pub_dt = dtp.parse(published) if published else None
-            upd_dt = dtp.parse(updated) if updated else None
-        except Exception:
-            pub_dt = upd_dt = None
-        def _to_utc(dt):
-            if not dt:
-                return None
-            if dt.tzinfo is None:
-                return dt.replace(tzinfo=timezone.utc)
-            return dt.astimezone(timezone.utc)
-        pub_dt_utc = _to_utc(pub_dt)
-        upd_dt_utc = _to_utc(upd_dt)
-        cats = re.findall(r'<category term="(.*?)"', e) or []
-        primary_cat = cats[0] if cats else "unknown"
-        authors = ", ".join(re.findall(r"<name>(.*?)</name>", e))
-        pdf_link = None
-        html_abs = None
-        for href, rel, _type in re.findall(r'<link href="(.*?)" rel="(.*?)"(?: type="(.*?)")?/?', e):
-            if rel == "alternate":
-                html_abs = href
-            if rel == "related" and (_type or "").endswith("pdf"):
-                pdf_link = href
-        if not pdf_link:
-            pdf_link = f"https://arxiv.org/pdf/{arxiv_id}.pdf"
-        if not html_abs:
-            html_abs = f"https://arxiv.org/abs/{arxiv_id}"
-        out.append({
-            "arxiv_id": arxiv_id,
-            "version": version,
-            "title": title,
-            "abstract": abstract,
-            "authors": authors,
-            "categories": ",".join(cats),
-            "primary_category": primary_cat,
-            "submitted_at": pub_dt_utc.isoformat() if pub_dt_utc else None,
-            "updated_at": upd_dt_utc.isoformat() if upd_dt_utc else None,
-            "links_pdf": pdf_link,
-            "links_abs": html_abs,
-            "links_html": f"https://ar5iv.org/html/{arxiv_id}",
-            "extra": {}
-        })
+    out = [p async for p in _atom_papers(params, client=client)]
     logger.info(f"Fetched {len(out)} entries by id from arXiv")
     return out
 
-async def ingest_by_id(session: AsyncSession, arxiv_id: str) -> int:
-    papers = await fetch_arxiv_by_ids([arxiv_id])
+async def ingest_by_id(session: AsyncSession, arxiv_id: str, client: Optional[httpx.AsyncClient] = None) -> int:
+    papers = await fetch_arxiv_by_ids([arxiv_id], client)
     await upsert_papers(session, papers)
     return len(papers)
 
 async def upsert_papers(session: AsyncSession, papers: List[Dict[str, Any]]):
     from ..models import Paper
-    # naive upsert by (arxiv_id, version) → keep latest
+    # upsert by (arxiv_id, version) → keep latest
+    dialect = session.get_bind().dialect.name
+    upsert = {"sqlite": sqlite_insert, "postgresql": pg_insert}.get(dialect)
+    if upsert is None:
+        text_changed = await _upsert_papers_orm(session, papers)
+    else:
+        # Last occurrence of a key wins; PG also refuses to update one row twice in a statement
+        rows = list({(p["arxiv_id"], p["version"]): p for p in papers}.values())
+        text_changed = False
+        conn = await session.connection()
+        for i in range(0, len(rows), _UPSERT_CHUNK):
+            chunk = rows[i:i + _UPSERT_CHUNK]
+            # Stored text of the rows about to be overwritten, for the BM25 cache below
+            keys = [(p["arxiv_id"], p["version"]) for p in chunk]
+            res = await session.execute(
+                select(Paper.arxiv_id, Paper.version, Paper.title, Paper.abstract)
+                .where(tuple_(Paper.arxiv_id, Paper.version).in_(keys))
+            )
+            by_key = dict(zip(keys, chunk))
+            for aid, v, t, a in res.all():
+                p = by_key[(aid, v)]
+                text_changed = text_changed or (t, a) != (p.get("title", t), p.get("abstract", a))
+            # Core statements skip the ORM validator that keeps announced_date in sync
+            values = [dict(p, announced_date=announced_date(p["submitted_at"])) if "submitted_at" in p else p
+                      for p in chunk]
+            # Table-level executemany: no ORM statement handling and one cached compiled
+            # statement (a multi-row VALUES would compile anew per chunk size)
+            ins = upsert(Paper.__table__)
+            stmt = ins.on_conflict_do_update(
+                index_elements=["arxiv_id", "version"],
+                set_={**{k: ins.excluded[k] for k in values[0] if k not in ("arxiv_id", "version")},
+                      "updated_ts": func.now()},
+            )
+            await conn.execute(stmt, values)
+    await session.commit()
+    if text_changed:
+        # Cached BM25 indexes pick up new rows on their own, but not edited text
+        BM25_CACHE.clear()
+
+async def _upsert_papers_orm(session: AsyncSession, papers: List[Dict[str, Any]]) -> bool:
+    # Row-by-row fallback for dialects without ON CONFLICT; True if stored text changed
+    from ..models import Paper
+    text_changed = False
     for p in papers:
         res = await session.execute(
             select(Paper).where(Paper.arxiv_id == p["arxiv_id"], Paper.version == p["version"])
@@ -252,15 +323,29 @@ async def upsert_papers(session: AsyncSession, papers: List[Dict[str, Any]]):
         row = res.scalar_one_or_none()
         if row:
             # update
+            text_changed = text_changed or (row.title, row.abstract) != (
+                p.get("title", row.title), p.get("abstract", row.abstract))
             for k, v in p.items():
                 setattr(row, k, v)
             session.add(row)
         else:
             row = Paper(**p)
             session.add(row)
-    await session.commit()
+    return text_changed
 
-async def ingest_today(session: AsyncSession, cats: List[str], days: int, max_results: int) -> int:
-    papers = await fetch_arxiv(cats, days, max_results)
+async def ingest_today(session: AsyncSession, cats: List[str], days: int, max_results: int,
+                       client: Optional[httpx.AsyncClient] = None) -> int:
+    # Validators are per query; saved only once its papers are stored
+    key = "arxiv_etag_" + hashlib.sha1(f"{sorted(cats)}|{days}|{max_results}".encode()).hexdigest()[:16]
+    kv = await session.get(ConfigKV, key)
+    validators = dict(kv.value) if kv and isinstance(kv.value, dict) else {}
+    seen = dict(validators)
+    papers = await fetch_arxiv(cats, days, max_results, validators, client)
     await upsert_papers(session, papers)
+    if validators != seen:
+        if kv:
+            kv.value = validators
+        else:
+            session.add(ConfigKV(key=key, value=validators))
+        await session.commit()
     return len(papers)
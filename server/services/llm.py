@@ -1,7 +1,14 @@
+import functools
 import os
-import json
+import orjson
 from typing import Dict, Any, Optional, Tuple, List
 
+from ..schemas import RubricScores
+
+# Bump when prompts/parsing change so cached LLM outputs are not reused
+RUBRIC_VERSION = "1"
+TAGS_VERSION = "1"
+
 def _clamp(x: int, lo=1, hi=5) -> int:
     return max(lo, min(hi, int(x)))
 
@@ -27,19 +34,22 @@ def _shrink_rubric(data: Dict[str, Any]) -> Dict[str, Any]:
     out["total"] = int(out["novelty"] + out["evidence"] + out["clarity"] + out["reusability"] + out["fit"])
     return out
 
+_REUSABILITY_KWS = ("code", "dataset", "open-sourced")
+
 def _heuristic_score(title: str, abstract: str) -> Dict[str, Any]:
     # very rough baseline so UI can show something without a key
     tl = len(title or "")
     al = len(abstract or "")
-    novelty = 3 + (1 if "first" in (abstract or "").lower() else 0)
+    abs_l = (abstract or "").lower()  # once, not per keyword
+    novelty = 3 + (1 if "first" in abs_l else 0)
     clarity = 3 + (1 if tl < 120 and al < 3000 else 0)
     evidence = 3
-    reusability = 2 + (1 if any(k in (abstract or "").lower() for k in ["code", "dataset", "open-sourced"]) else 0)
+    reusability = 2 + (1 if any(k in abs_l for k in _REUSABILITY_KWS) else 0)
     fit = 3
     total = novelty + clarity + evidence + reusability + fit
     return _shrink_rubric({"novelty": novelty, "evidence": evidence, "clarity": clarity, "reusability": reusability, "fit": fit, "total": total})
 
-def llm_rubric_score(title: str, abstract: str, provider: Optional[str] = None) -> Dict[str, Any]:
+def llm_rubric_score(title: str, abstract: str, provider: Optional[str] = None, fallback: bool = True) -> Optional[Dict[str, Any]]:
     """
     Compute rubric scores via an LLM provider if configured, else return a heuristic fallback.
 
@@ -56,29 +66,45 @@ def llm_rubric_score(title: str, abstract: str, provider: Optional[str] = None)
       - DEEPSEEK_API_KEY (or OPENAI_API_KEY)
       - DEEPSEEK_BASE_URL (default: https://api.deepseek.com/v1)
       - DEEPSEEK_MODEL (default: deepseek-chat)
+
+    With `fallback=False`, returns None instead of the heuristic so callers can
+    tell a real LLM answer apart (e.g. to avoid caching fallbacks).
     """
     prov = (provider or os.getenv("LLM_PROVIDER") or "openai").strip().lower()
     try:
         from openai import OpenAI
     except Exception:
         # SDK not installed at runtime
-        return _heuristic_score(title, abstract)
+        return _heuristic_score(title, abstract) if fallback else None
 
     if prov == "deepseek":
         api_key = os.getenv("DEEPSEEK_API_KEY") or os.getenv("OPENAI_API_KEY")
         if not api_key:
-            return _heuristic_score(title, abstract)
+            return _heuristic_score(title, abstract) if fallback else None
         base_url = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com/v1")
-        model = os.getenv("DEEPSEEK_MODEL", os.getenv("LLM_MODEL", "deepseek-chat"))
-        client = OpenAI(api_key=api_key, base_url=base_url)
+        model = model_name(prov)
+        client = _openai_client(api_key, base_url)
     else:
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
-            return _heuristic_score(title, abstract)
+            return _heuristic_score(title, abstract) if fallback else None
         base_url = os.getenv("OPENAI_BASE_URL") or os.getenv("OPENAI_API_BASE")
-        model = os.getenv("LLM_MODEL", "gpt-4o-mini")
-        client = OpenAI(api_key=api_key, base_url=base_url) if base_url else OpenAI(api_key=api_key)
+        model = model_name(prov)
+        client = _openai_client(api_key, base_url)
 
+    try:
+        resp = client.chat.completions.create(
+            model=model, messages=_rubric_messages(title, abstract), **_RUBRIC_PARAMS,
+        )
+        content = resp.choices[0].message.content if getattr(resp, "choices", None) else ""
+        return _parse_rubric(content)
+    except Exception:
+        # fall back gracefully
+        return _heuristic_score(title, abstract) if fallback else None
+
+_RUBRIC_PARAMS = {"temperature": 0.0, "max_tokens": 120}
+
+def _rubric_messages(title: str, abstract: str) -> List[Dict[str, str]]:
     system = (
         "You are a conservative paper reviewer. Return ONLY a compact JSON object with integer scores."
         " Rubric: novelty(1-5), evidence(1-5), clarity(1-5), reusability(1-5), fit(1-5)."
@@ -89,31 +115,27 @@ def llm_rubric_score(title: str, abstract: str, provider: Optional[str] = None)
         f"Title: {title}\n\nAbstract: {abstract}\n\n"
         "Respond as JSON: {\"novelty\":n,\"evidence\":n,\"clarity\":n,\"reusability\":n,\"fit\":n,\"total\":n}"
     )
+    return [{"role": "system", "content": system}, {"role": "user", "content": user}]
+
+def _parse_rubric(content: Optional[str]) -> Dict[str, Any]:
+    """Shrunk rubric scores from the model's reply; raises if it isn't a complete rubric."""
+    # Parsed and validated (all six fields, ints) in one pass by pydantic-core
+    return _shrink_rubric(RubricScores.model_validate_json(content or "{}").model_dump())
 
-    try:
-        resp = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": system},
-                {"role": "user", "content": user},
-            ],
-            temperature=0.0,
-            max_tokens=120,
-        )
-        content = resp.choices[0].message.content if getattr(resp, "choices", None) else ""
-        data = json.loads(content or "{}")
-        # validate fields
-        fields = ["novelty", "evidence", "clarity", "reusability", "fit", "total"]
-        if not all(k in data for k in fields):
-            raise ValueError("missing fields")
-        # coerce to ints
-        for k in fields:
-            data[k] = int(data.get(k, 0))
-        return _shrink_rubric(data)
-    except Exception:
-        # fall back gracefully
-        return _heuristic_score(title, abstract)
 
+@functools.lru_cache(maxsize=8)
+def _openai_client(api_key: str, base_url: Optional[str]):
+    # One client (and httpx connection pool) per credentials/endpoint, shared by every
+    # call and worker thread instead of a new client and TLS handshake per paper
+    from openai import OpenAI
+    return OpenAI(api_key=api_key, base_url=base_url) if base_url else OpenAI(api_key=api_key)
+
+def model_name(provider: Optional[str] = None) -> str:
+    """Model the provider's env selects (see llm_rubric_score for the variables)."""
+    prov = (provider or os.getenv("LLM_PROVIDER") or "openai").strip().lower()
+    if prov == "deepseek":
+        return os.getenv("DEEPSEEK_MODEL", os.getenv("LLM_MODEL", "deepseek-chat"))
+    return os.getenv("LLM_MODEL", "gpt-4o-mini")
 
 def _make_client_and_model(provider: Optional[str] = None) -> Optional[Tuple["OpenAI", str]]:  # type: ignore[name-defined]
     try:
@@ -126,17 +148,15 @@ def _make_client_and_model(provider: Optional[str] = None) -> Optional[Tuple["Op
         if not api_key:
             return None
         base_url = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com/v1")
-        model = os.getenv("DEEPSEEK_MODEL", os.getenv("LLM_MODEL", "deepseek-chat"))
-        client = OpenAI(api_key=api_key, base_url=base_url)
-        return client, model
+        client = _openai_client(api_key, base_url)
+        return client, model_name(prov)
     # default openai
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         return None
     base_url = os.getenv("OPENAI_BASE_URL") or os.getenv("OPENAI_API_BASE")
-    model = os.getenv("LLM_MODEL", "gpt-4o-mini")
-    client = OpenAI(api_key=api_key, base_url=base_url) if base_url else OpenAI(api_key=api_key)
-    return client, model
+    client = _openai_client(api_key, base_url)
+    return client, model_name(prov)
 
 
 def llm_suggest_tags(title: str, abstract: str, categories: Optional[str] = None, provider: Optional[str] = None) -> List[str]:
@@ -148,6 +168,18 @@ def llm_suggest_tags(title: str, abstract: str, categories: Optional[str] = None
     if not made:
         return []
     client, model = made
+    try:
+        resp = client.chat.completions.create(
+            model=model, messages=_tags_messages(title, abstract, categories), **_TAGS_PARAMS,
+        )
+        content = resp.choices[0].message.content if getattr(resp, "choices", None) else ""
+        return _parse_tags(content)
+    except Exception:
+        return []
+
+_TAGS_PARAMS = {"temperature": 0.2, "max_tokens": 120}
+
+def _tags_messages(title: str, abstract: str, categories: Optional[str]) -> List[Dict[str, str]]:
     system = (
         "You generate concise topical tags for arXiv papers."
         " Return ONLY a JSON array of up to 5 short tags (1-3 words)."
@@ -157,37 +189,88 @@ def llm_suggest_tags(title: str, abstract: str, categories: Optional[str] = None
         f"Title: {title}\n\nAbstract: {abstract}\n\n"
         f"Categories: {categories or ''}\n\nReturn JSON array of tags, e.g. [\"diffusion-models\", \"few-shot-learning\"]."
     )
+    return [{"role": "system", "content": system}, {"role": "user", "content": user}]
+
+def _parse_tags(content: Optional[str]) -> List[str]:
+    raw = []
     try:
-        resp = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": system},
-                {"role": "user", "content": user},
-            ],
-            temperature=0.2,
-            max_tokens=120,
-        )
-        content = resp.choices[0].message.content if getattr(resp, "choices", None) else ""
-        raw = []
+        raw = orjson.loads(content or "[]")
+    except Exception:
+        # fallback: split by commas
+        raw = [x.strip() for x in (content or "").split(",")]
+    # normalize
+    out: List[str] = []
+    for t in raw:
+        if not isinstance(t, str):
+            continue
+        s = t.lower().strip()
+        s = s.replace("/", "-")
+        s = s.replace(" ", "-")
+        s = "".join(ch for ch in s if ch.isalnum() or ch == "-")
+        s = s.strip("-")
+        if s and s not in out:
+            out.append(s)
+        if len(out) >= 5:
+            break
+    return out
+
+
+# OpenAI Batch API: half the price and no per-request rate limits, results within 24h.
+# DeepSeek has no batch endpoint, so such providers keep the per-paper calls.
+_BATCH_PROVIDERS = {"openai"}
+
+_BATCH_KINDS = {
+    "rubric": (_rubric_messages, _RUBRIC_PARAMS, _parse_rubric),
+    "tags": (_tags_messages, _TAGS_PARAMS, _parse_tags),
+}
+
+def supports_batch(provider: Optional[str] = None) -> bool:
+    prov = (provider or os.getenv("LLM_PROVIDER") or "openai").strip().lower()
+    return prov in _BATCH_PROVIDERS and _make_client_and_model(prov) is not None
+
+def submit_batch(kind: str, items: Dict[str, tuple], provider: Optional[str] = None) -> Optional[str]:
+    """
+    Submit one chat completion per item as a single Batch API job and return its id.
+    `items` maps a custom id to the prompt arguments ((title, abstract) for "rubric",
+    (title, abstract, categories) for "tags"). None if the provider can't batch.
+    """
+    if not items or not supports_batch(provider):
+        return None
+    client, model = _make_client_and_model(provider)
+    messages, params, _ = _BATCH_KINDS[kind]
+    lines = [
+        orjson.dumps({"custom_id": cid, "method": "POST", "url": "/v1/chat/completions",
+                      "body": {"model": model, "messages": messages(*args), **params}})
+        for cid, args in items.items()
+    ]
+    upload = client.files.create(file=("batch.jsonl", b"\n".join(lines)), purpose="batch")
+    job = client.batches.create(input_file_id=upload.id, endpoint="/v1/chat/completions", completion_window="24h")
+    return job.id
+
+def batch_results(batch_id: str, kind: str, provider: Optional[str] = None) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+    (status, results) of a submitted batch; results (custom id -> parsed rubric/tags) only
+    once it is "completed". Items whose request failed or whose reply doesn't parse are
+    left out, as are empty tag lists.
+    """
+    made = _make_client_and_model(provider)
+    if not made:
+        return "unavailable", None
+    client, _ = made
+    job = client.batches.retrieve(batch_id)
+    if job.status != "completed":
+        return job.status, None
+    parse = _BATCH_KINDS[kind][2]
+    out: Dict[str, Any] = {}
+    if not job.output_file_id:
+        return job.status, out
+    for line in client.files.content(job.output_file_id).content.splitlines():
         try:
-            raw = json.loads(content or "[]")
+            rec = orjson.loads(line)
+            body = (rec.get("response") or {}).get("body") or {}
+            value = parse(body["choices"][0]["message"]["content"])
         except Exception:
-            # fallback: split by commas
-            raw = [x.strip() for x in (content or "").split(",")]
-        # normalize
-        out: List[str] = []
-        for t in raw:
-            if not isinstance(t, str):
-                continue
-            s = t.lower().strip()
-            s = s.replace("/", "-")
-            s = s.replace(" ", "-")
-            s = "".join(ch for ch in s if ch.isalnum() or ch == "-")
-            s = s.strip("-")
-            if s and s not in out:
-                out.append(s)
-            if len(out) >= 5:
-                break
-        return out
-    except Exception:
-        return []
+            continue
+        if value:
+            out[rec["custom_id"]] = value
+    return job.status, out
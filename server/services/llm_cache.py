@@ -0,0 +1,155 @@
+import asyncio
+import hashlib
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models import LLMCache
+from .llm import llm_rubric_score, llm_suggest_tags, model_name, _heuristic_score, RUBRIC_VERSION, TAGS_VERSION
+
+def enabled() -> bool:
+    # ARX_LLM_CACHE=0 bypasses the cache (debugging prompts/providers)
+    return os.getenv("ARX_LLM_CACHE", "1").strip() != "0"
+
+def _provider(provider: Optional[str]) -> str:
+    return (provider or os.getenv("LLM_PROVIDER") or "openai").strip().lower()
+
+def make_key(kind: str, version: str, provider: Optional[str], *parts: str) -> str:
+    # The model is part of the key, so switching LLM_MODEL/DEEPSEEK_MODEL re-scores
+    raw = "\n".join([kind, version, _provider(provider), model_name(provider), *(p or "" for p in parts)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def item_key(kind: str, provider: Optional[str], *parts: str) -> str:
+    """Cache key of a "rubric" (title, abstract) or "tags" (title, abstract, categories) item."""
+    return make_key(kind, RUBRIC_VERSION if kind == "rubric" else TAGS_VERSION, provider, *parts)
+
+async def get(session: AsyncSession, key: str) -> Optional[Any]:
+    row = await session.get(LLMCache, key)
+    if row and row.value is not None:
+        return row.value.get("v")
+    return None
+
+async def put(session: AsyncSession, key: str, value: Any) -> None:
+    # Caller commits; merge makes re-puts an update instead of a PK conflict
+    await session.merge(LLMCache(key=key, value={"v": value}))
+
+async def put_many(session: AsyncSession, items: Dict[str, Any]) -> None:
+    """put() for many keys: one executemany upsert instead of a merge (SELECT) per key."""
+    if not items:
+        return
+    dialect = session.get_bind().dialect.name
+    if dialect not in ("sqlite", "postgresql"):
+        for key, value in items.items():
+            await put(session, key, value)
+        return
+    ins = (sqlite_insert if dialect == "sqlite" else pg_insert)(LLMCache)
+    stmt = ins.on_conflict_do_update(index_elements=[LLMCache.key], set_={"value": ins.excluded.value})
+    conn = await session.connection()
+    await conn.execute(stmt, [{"key": k, "value": {"v": v}} for k, v in items.items()])
+
+async def cached_rubric_score(session: AsyncSession, title: str, abstract: str, provider: Optional[str] = None) -> Dict[str, Any]:
+    """Rubric scores, served from the cache when this exact title/abstract was
+    already scored by the same provider and rubric version. Heuristic fallbacks
+    are returned but never stored."""
+    use = enabled()
+    key = make_key("rubric", RUBRIC_VERSION, provider, title, abstract)
+    if use:
+        hit = await get(session, key)
+        if hit is not None:
+            return hit
+    scores = await asyncio.to_thread(llm_rubric_score, title, abstract, provider, False)
+    if scores is None:
+        return _heuristic_score(title, abstract)
+    if use:
+        await put(session, key, scores)
+    return scores
+
+async def cached_suggest_tags(session: AsyncSession, title: str, abstract: str, categories: str, provider: Optional[str] = None) -> List[str]:
+    """Tag suggestions with the same caching policy; empty results (provider
+    unavailable or failed) are not stored."""
+    use = enabled()
+    key = make_key("tags", TAGS_VERSION, provider, title, abstract, categories)
+    if use:
+        hit = await get(session, key)
+        if hit is not None:
+            return hit
+    tags = await asyncio.to_thread(llm_suggest_tags, title, abstract, categories, provider)
+    if tags and use:
+        await put(session, key, tags)
+    return tags
+
+async def _fan_out(calls: Sequence[Callable[[], Any]], concurrency: int, delay: float) -> List[Any]:
+    """Run blocking calls in threads, at most `concurrency` at once. Starts are paced by a
+    token bucket of `concurrency` tokens refilled one per `delay` seconds (provider rate
+    limits): a burst goes out at once, the long-run rate stays one call per `delay`.
+    Exceptions are returned, not raised."""
+    burst = max(1, concurrency)
+    sem = asyncio.Semaphore(burst)
+    lock = asyncio.Lock()
+    tokens, last = float(burst), time.monotonic()
+
+    async def one(call):
+        nonlocal tokens, last
+        async with sem:
+            if delay > 0:
+                async with lock:
+                    now = time.monotonic()
+                    tokens = min(burst, tokens + (now - last) / delay)
+                    last = now
+                    if tokens < 1:
+                        await asyncio.sleep((1 - tokens) * delay)
+                        tokens, last = 1.0, time.monotonic()
+                    tokens -= 1
+            return await asyncio.to_thread(call)
+    return await asyncio.gather(*(one(c) for c in calls), return_exceptions=True)
+
+async def _get_many(session: AsyncSession, keys: List[str]) -> Dict[str, Any]:
+    res = await session.execute(select(LLMCache).where(LLMCache.key.in_(set(keys))))
+    return {row.key: row.value.get("v") for row in res.scalars() if row.value is not None}
+
+async def cached_rubric_score_many(session: AsyncSession, items: Sequence[Tuple[str, str]], provider: Optional[str] = None,
+                               concurrency: int = 8, delay: float = 0.0) -> List[Any]:
+    """Batch form of cached_rubric_score for (title, abstract) items: one cache lookup,
+    LLM calls for the misses run concurrently. Results align with `items`; a failed
+    call yields its exception. The session is only touched from this coroutine."""
+    use = enabled()
+    keys = [make_key("rubric", RUBRIC_VERSION, provider, t, a) for t, a in items]
+    hits = await _get_many(session, keys) if use else {}
+    todo = [i for i, k in enumerate(keys) if k not in hits]
+    fresh = await _fan_out(
+        [lambda t=items[i][0], a=items[i][1]: llm_rubric_score(t, a, provider, False) for i in todo],
+        concurrency, delay,
+    )
+    out: List[Any] = [hits.get(k) for k in keys]
+    new: Dict[str, Any] = {}
+    for i, scores in zip(todo, fresh):
+        if scores is None:
+            scores = _heuristic_score(*items[i])
+        elif use and not isinstance(scores, BaseException):
+            new[keys[i]] = scores
+        out[i] = scores
+    await put_many(session, new)
+    return out
+
+async def cached_suggest_tags_many(session: AsyncSession, items: Sequence[Tuple[str, str, str]], provider: Optional[str] = None,
+                                   concurrency: int = 8, delay: float = 0.0) -> List[Any]:
+    """Batch form of cached_suggest_tags for (title, abstract, categories) items."""
+    use = enabled()
+    keys = [make_key("tags", TAGS_VERSION, provider, t, a, c) for t, a, c in items]
+    hits = await _get_many(session, keys) if use else {}
+    todo = [i for i, k in enumerate(keys) if k not in hits]
+    fresh = await _fan_out(
+        [lambda it=items[i]: llm_suggest_tags(*it, provider) for i in todo],
+        concurrency, delay,
+    )
+    out: List[Any] = [hits.get(k) for k in keys]
+    new: Dict[str, Any] = {}
+    for i, tags in zip(todo, fresh):
+        if tags and use and not isinstance(tags, BaseException):
+            new[keys[i]] = tags
+        out[i] = tags
+    await put_many(session, new)
+    return out
@@ -1,5 +1,8 @@
 import asyncio
+import time
+import xml.etree.ElementTree as ET
 from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
 from typing import Any, Dict, List, Optional, Tuple
 
 import httpx
@@ -7,43 +10,77 @@ from loguru import logger
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from .ingest import upsert_papers
+from .announce import parse_timestamp
+from .ingest import _PARSE_CHUNK, _client_or_new, upsert_papers
 from ..models import ConfigKV
 
 ARXIV_OAI_BASE = "https://oaipmh.arxiv.org/oai"
 
 
+class _Pacer:
+    """Spaces requests at least `interval` seconds apart across every task using it."""
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        self._last = float("-inf")
+
+    async def wait(self, interval: float) -> None:
+        async with self._lock:
+            delay = self._last + interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._last = time.monotonic()
+
+
+# arXiv asks for ~1 OAI request per 3s per client, not per category
+_OAI_PACER = _Pacer()
+
+
 def _utc_date_only(dt: datetime) -> str:
     return dt.astimezone(timezone.utc).date().isoformat()
 
 
+def _to_iso_utc(s: Optional[str]) -> Optional[str]:
+    """Normalize OAI dates (RFC 2822 in <version><date>) to UTC ISO-8601,
+    matching what the Atom ingest stores in `submitted_at`/`updated_at`.
+    """
+    if not s:
+        return s
+    try:
+        # stdlib RFC 2822 parser first: dateutil dominated record parsing
+        dt = parsedate_to_datetime(s)
+    except (TypeError, ValueError):
+        try:
+            dt = parse_timestamp(s)
+        except Exception:
+            return s
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc).isoformat()
+
+
 def _strip_ns(tag: str) -> str:
     return tag.split('}', 1)[-1] if '}' in tag else tag
 
 
-def _xml_iter_children(elem):
-    for c in list(elem):
-        yield _strip_ns(c.tag), c
+def _ns(elem: ET.Element) -> str:
+    # "{uri}" prefix of an element's tag ("" if unqualified), for C-level find() calls
+    tag = elem.tag
+    return tag[:tag.index('}') + 1] if tag[:1] == '{' else ''
 
 
-def _parse_oai_record(record_xml: str) -> Optional[Dict[str, Any]]:
-    """Parse a single <record> XML chunk into our Paper dict.
-    We avoid strict namespace reliance by stripping tag namespaces.
-    """
-    import xml.etree.ElementTree as ET
+def _findtext(elem: ET.Element, tag: str) -> Optional[str]:
+    t = elem.findtext(tag)
+    return t.strip() if t is not None else None
 
-    try:
-        root = ET.fromstring(record_xml)
-    except Exception:
-        return None
 
-    header = root.find('.//*')  # first child under record
-    # Resolve header node
-    hdr = None
-    for tag, node in _xml_iter_children(root):
-        if tag == 'header':
-            hdr = node
-            break
+def _parse_oai_record(root: ET.Element) -> Optional[Dict[str, Any]]:
+    """Parse a single <record> element into our Paper dict.
+    Namespaces are taken from the record and its metadata element rather than
+    hard-coded, so both the arXiv and arXivRaw formats parse.
+    """
+    oai = _ns(root)
+    hdr = root.find(oai + 'header')
     if hdr is None:
         return None
 
@@ -51,90 +88,48 @@ def _parse_oai_record(record_xml: str) -> Optional[Dict[str, Any]]:
     if hdr.attrib.get('status') == 'deleted':
         return None
 
-    identifier = None
-    datestamp = None
-    for t, n in _xml_iter_children(hdr):
-        if t == 'identifier':
-            identifier = (n.text or '').strip()
-        elif t == 'datestamp':
-            datestamp = (n.text or '').strip()
+    identifier = _findtext(hdr, oai + 'identifier')
+    datestamp = _findtext(hdr, oai + 'datestamp')
     if not identifier:
         return None
     # identifier like oai:arXiv:2501.01234
     arxiv_id = identifier.split(':')[-1]
 
-    # metadata block → arXiv specific structure
-    md = None
-    for tag, node in _xml_iter_children(root):
-        if tag == 'metadata':
-            md = node
-            break
+    # metadata block → arXiv specific structure (its first child element)
+    md = root.find(oai + 'metadata')
     if md is None:
         return None
-
-    # arXiv element lives under metadata; find first child element
-    arx = None
-    for _, node in _xml_iter_children(md):
-        arx = node
-        break
+    arx = md.find('*')
     if arx is None:
         return None
+    ns = _ns(arx)
 
-    title = ''
-    abstract = ''
+    title = _findtext(arx, ns + 'title') or ''
+    abstract = _findtext(arx, ns + 'abstract') or ''
+    created_ts = _findtext(arx, ns + 'created')
+    categories_tokens = (arx.findtext(ns + 'categories') or '').split()
+
+    # authors/author with keyname + forenames (arXiv) or name (arXivRaw)
     authors_list: List[str] = []
-    categories_tokens: List[str] = []
-    created_ts: Optional[str] = None
-    versions: List[Tuple[int, str]] = []  # (vnum, date)
+    for a in arx.iterfind(f'{ns}authors/{ns}author'):
+        fullname = _findtext(a, ns + 'name')
+        if fullname:
+            authors_list.append(fullname)
+        else:
+            name = ((_findtext(a, ns + 'forenames') or '') + ' ' + (_findtext(a, ns + 'keyname') or '')).strip()
+            if name:
+                authors_list.append(name)
 
-    for tag, node in _xml_iter_children(arx):
-        if tag == 'title':
-            title = (node.text or '').strip()
-        elif tag == 'abstract':
-            abstract = (node.text or '').strip()
-        elif tag == 'authors':
-            # authors/author with keyname + forenames
-            for _t, a in _xml_iter_children(node):
-                if _t != 'author':
-                    continue
-                keyname = ''
-                forenames = ''
-                fullname = ''
-                for __t, f in _xml_iter_children(a):
-                    if __t == 'keyname':
-                        keyname = (f.text or '').strip()
-                    elif __t == 'forenames':
-                        forenames = (f.text or '').strip()
-                    elif __t == 'name':
-                        fullname = (f.text or '').strip()
-                if fullname:
-                    authors_list.append(fullname)
-                else:
-                    name = (forenames + ' ' + keyname).strip()
-                    if name:
-                        authors_list.append(name)
-        elif tag == 'categories':
-            text = (node.text or '').strip()
-            if text:
-                categories_tokens = [tok for tok in text.split() if tok]
-        elif tag == 'created':
-            created_ts = (node.text or '').strip()
-        elif tag == 'versions':
-            for __t, v in _xml_iter_children(node):
-                if __t != 'version':
-                    continue
-                vlabel = v.attrib.get('version', '')  # like v2
+    versions: List[Tuple[int, str]] = []  # (vnum, date)
+    for v in arx.iterfind(f'{ns}versions/{ns}version'):
+        vlabel = v.attrib.get('version', '')  # like v2
+        vnum = 0
+        if vlabel.startswith('v'):
+            try:
+                vnum = int(vlabel[1:])
+            except Exception:
                 vnum = 0
-                if vlabel.startswith('v'):
-                    try:
-                        vnum = int(vlabel[1:])
-                    except Exception:
-                        vnum = 0
-                vdate = ''
-                for ___t, f in _xml_iter_children(v):
-                    if ___t == 'date':
-                        vdate = (f.text or '').strip()
-                versions.append((vnum, vdate))
+        versions.append((vnum, _findtext(v, ns + 'date') or ''))
 
     version = max([v for v, _ in versions], default=1)
     # submitted/updated timestamps: derive from versions if present
@@ -149,6 +144,9 @@ def _parse_oai_record(record_xml: str) -> Optional[Dict[str, Any]]:
         submitted_at = created_ts
         updated_at = datestamp
 
+    submitted_at = _to_iso_utc(submitted_at)
+    updated_at = _to_iso_utc(updated_at)
+
     cats = categories_tokens
     primary_cat = cats[0] if cats else 'unknown'
 
@@ -171,31 +169,39 @@ def _parse_oai_record(record_xml: str) -> Optional[Dict[str, Any]]:
 
 async def _oai_list_records_once(client: httpx.AsyncClient, params: Dict[str, str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
     logger.debug(f"OAI-PMH request params: {params}")
-    r = await client.get(ARXIV_OAI_BASE, params=params, headers={"User-Agent": "arxiv-news-agent/0.1 (github.com/you)"})
-    r.raise_for_status()
-    text = r.text
-
-    # Split by <record> to avoid dealing with heavier XML parsing for pagination
-    recs_raw = text.split('<record>')[1:]
+    # Pull-parse the streamed page in a worker thread, a chunk at a time; records are
+    # converted and dropped as they close
+    parser = ET.XMLPullParser(["end"])
     out: List[Dict[str, Any]] = []
-    for raw in recs_raw:
-        # close tag included at end, rebuild element for parser
-        raw_xml = '<record>' + raw
-        rec = _parse_oai_record(raw_xml)
-        if rec:
-            out.append(rec)
-
-    # Extract resumptionToken if present
-    # Token may be empty content when finished
-    import re
-    m = re.search(r"<resumptionToken[^>]*>(.*?)</resumptionToken>", text, re.DOTALL)
-    token = m.group(1).strip() if m else None
-    if token == '':
-        token = None
+    token: Optional[str] = None
+
+    def feed(chunk: Optional[bytes]) -> None:
+        nonlocal token
+        if chunk is None:
+            parser.close()
+        else:
+            parser.feed(chunk)
+        for _, el in parser.read_events():
+            tag = _strip_ns(el.tag)
+            if tag == 'record':
+                rec = _parse_oai_record(el)
+                if rec:
+                    out.append(rec)
+                el.clear()
+            elif tag == 'resumptionToken':
+                # Token may be empty content when finished
+                token = (el.text or '').strip() or None
+
+    async with client.stream("GET", ARXIV_OAI_BASE, params=params, headers={"User-Agent": "arxiv-news-agent/0.1 (github.com/you)"}, timeout=40.0) as r:
+        r.raise_for_status()
+        async for chunk in r.aiter_bytes(_PARSE_CHUNK):
+            await asyncio.to_thread(feed, chunk)
+    await asyncio.to_thread(feed, None)
     return out, token
 
 
-async def harvest_oai_category(cat: str, since_date_iso: str, until_date_iso: str, delay_seconds: float = 3.0) -> List[Dict[str, Any]]:
+async def harvest_oai_category(cat: str, since_date_iso: str, until_date_iso: str, delay_seconds: float = 3.0,
+                               client: Optional[httpx.AsyncClient] = None) -> List[Dict[str, Any]]:
     """Harvest a single category using OAI-PMH ListRecords.
     since/until are date-only strings (YYYY-MM-DD) to match arXiv granularity.
     """
@@ -209,10 +215,11 @@ async def harvest_oai_category(cat: str, since_date_iso: str, until_date_iso: st
         "until": until_date_iso,
     }
     all_rows: List[Dict[str, Any]] = []
-    async with httpx.AsyncClient(timeout=40.0, follow_redirects=True) as client:
+    async with _client_or_new(client, 40.0) as client:
         page = 0
         while True:
             page += 1
+            await _OAI_PACER.wait(delay_seconds)
             rows, token = await _oai_list_records_once(client, params)
             all_rows.extend(rows)
             logger.info(f"OAI {cat}: fetched page {page}, rows+={len(rows)}, total={len(all_rows)}")
@@ -220,8 +227,6 @@ async def harvest_oai_category(cat: str, since_date_iso: str, until_date_iso: st
                 break
             # Next page with resumptionToken
             params = {"verb": "ListRecords", "resumptionToken": token}
-            if delay_seconds > 0:
-                await asyncio.sleep(delay_seconds)
     return all_rows
 
 
@@ -248,26 +253,39 @@ async def set_oai_checkpoint(session: AsyncSession, cat: str, datestamp: str) ->
     await session.commit()
 
 
-async def ingest_oai(session: AsyncSession, cats: List[str], days: int = 3, use_checkpoint: bool = True) -> int:
+async def ingest_oai(session: AsyncSession, cats: List[str], days: int = 3, use_checkpoint: bool = True,
+                     client: Optional[httpx.AsyncClient] = None) -> int:
     """Harvest papers via OAI-PMH for given categories and upsert.
     If use_checkpoint, start from the last stored datestamp per-cat; else from now-days.
     """
     now = datetime.now(timezone.utc)
     until = _utc_date_only(now)
-    total_added = 0
+    since_for: Dict[str, str] = {}
     for cat in cats:
         since = None
         if use_checkpoint:
             since = await get_oai_checkpoint(session, cat)
-        if not since:
-            since = _utc_date_only(now - timedelta(days=days))
-
-        logger.info(f"OAI harvest start: cat={cat} from={since} until={until}")
-        rows = await harvest_oai_category(cat, since, until)
-        
+        since_for[cat] = since or _utc_date_only(now - timedelta(days=days))
+        logger.info(f"OAI harvest start: cat={cat} from={since_for[cat]} until={until}")
+
+    # Categories harvest concurrently; the shared pacer keeps requests spaced, so their
+    # fetch/parse time overlaps the waits instead of adding to them
+    results = await asyncio.gather(
+        *(harvest_oai_category(cat, since_for[cat], until, client=client) for cat in since_for),
+        return_exceptions=True,
+    )
+    total_added = 0
+    error: Optional[BaseException] = None
+    for cat, rows in zip(since_for, results):
+        if isinstance(rows, BaseException):
+            logger.warning(f"OAI harvest failed: cat={cat}: {rows}")
+            error = error or rows
+            continue
         if rows:
             await upsert_papers(session, rows)
             total_added += len(rows)
         await set_oai_checkpoint(session, cat, until)
+    if error is not None:
+        # The other categories are stored and checkpointed; report the failure
+        raise error
     return total_added
-
@@ -1,15 +1,234 @@
-from rank_bm25 import BM25Okapi
-from typing import List, Tuple
+from collections import OrderedDict, defaultdict
+from functools import lru_cache
+from itertools import chain
+from typing import Hashable, List, Optional, Sequence, Tuple
+import math
 import re
 
+import numpy as np
+
+# Applied to lowercased text, so no uppercase range
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
 def _tokenize(s: str):
-    return re.findall(r"[A-Za-z0-9]+", s.lower())
+    return _TOKEN_RE.findall(s.lower())
+
+@lru_cache(maxsize=1024)
+def query_tokens(query: str) -> Tuple[str, ...]:
+    """Tokens of a search query; cached since the UI resends the same prefixes."""
+    return tuple(_tokenize(query))
+
+def _term_ids(vocab: dict, corpus: Sequence[List[str]], count: int) -> np.ndarray:
+    """Flat term ids of `corpus`; `vocab` assigns ids to unseen terms."""
+    return np.fromiter(chain.from_iterable(map(vocab.__getitem__, toks) for toks in corpus),
+                       dtype=np.int64, count=count)
+
+class BM25Index:
+    """
+    Okapi BM25 over posting lists stored as flat arrays (doc positions + per-posting impacts).
+
+    Parameters, idf floor and scores match rank_bm25.BM25Okapi, but a query only touches
+    the postings of its own terms instead of every document.
+    """
+
+    RESULTS_MAXSIZE = 32
+
+    def __init__(self, doc_ids: Sequence[int], corpus: Sequence[List[str]],
+                 k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25):
+        self.k1, self.b, self.epsilon = k1, b, epsilon
+        n = len(corpus)
+        doc_len = np.array([len(toks) for toks in corpus], dtype=np.int64)
+        # Term ids in first-seen order (rank_bm25's idf iteration order)
+        vocab: defaultdict[str, int] = defaultdict()
+        vocab.default_factory = vocab.__len__
+        terms = _term_ids(vocab, corpus, int(doc_len.sum()))
+        # One sort of (term, doc) keys yields postings grouped by term, docs ascending
+        stride = max(n, 1)
+        keys, tf = np.unique(terms * stride + np.repeat(np.arange(n), doc_len), return_counts=True)
+        self._build(doc_ids, doc_len, vocab, keys, tf, stride)
+
+    def _build(self, doc_ids, doc_len: np.ndarray, vocab: dict, keys: np.ndarray,
+               tf: np.ndarray, stride: int) -> None:
+        """Index arrays from sorted (term * stride + doc position) posting keys and their tfs."""
+        self.doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        self._results: "OrderedDict[Tuple[str, ...], tuple[Optional[int], List[int]]]" = OrderedDict()
+        n = len(doc_len)
+        k1, b = self.k1, self.b
+        term_of = keys // stride
+        self._pos = (keys % stride).astype(np.intp)
+        self._tf = tf
+        self._doc_len = doc_len
+        df = np.bincount(term_of, minlength=len(vocab))
+        self._start = np.concatenate(([0], np.cumsum(df))).tolist()
+        self._vocab = dict(vocab)
+
+        avgdl = doc_len.sum() / n if n else 0.0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Per-document length normalisation, shared by every term
+            norm = k1 * (1 - b + b * doc_len / avgdl)
+        # Query-independent part of each posting's score, so a query only scales by idf
+        tf = tf.astype(np.float64)
+        self._impact = tf * (k1 + 1) / (tf + norm[self._pos])
+
+        # rank_bm25's idf, including the epsilon floor for terms in over half the docs
+        self.idf: dict[str, float] = {}
+        idf_sum = 0.0
+        negative = []
+        for t, freq in zip(self._vocab, df.tolist()):
+            idf = math.log(n - freq + 0.5) - math.log(freq + 0.5)
+            self.idf[t] = idf
+            idf_sum += idf
+            if idf < 0:
+                negative.append(t)
+        if self.idf:
+            eps = self.epsilon * idf_sum / len(self.idf)
+            for t in negative:
+                self.idf[t] = eps
+
+    @classmethod
+    def from_docs(cls, docs: Sequence[Tuple[int, str]]) -> "BM25Index":
+        return cls([i for i, _ in docs], [_tokenize(text) for _, text in docs])
+
+    def extended(self, doc_ids: Sequence[int], docs: Sequence[Tuple[int, str]]) -> Optional["BM25Index"]:
+        """
+        A new index over `doc_ids` (the whole corpus, in corpus order) from this one plus
+        `docs`, the (id, text) pairs it doesn't have yet. Only `docs` are tokenized; existing
+        postings are reused. None unless `doc_ids` is exactly this corpus plus `docs`.
+        Scores equal a rebuild's up to float rounding of the idf floor.
+        """
+        ids = np.asarray(doc_ids, dtype=np.int64)
+        n = len(ids)
+        if n != len(self) + len(docs):
+            return None
+        # New position of every old and new document
+        by_id = np.argsort(ids, kind="stable")
+        sorted_ids = ids[by_id]
+
+        def positions(wanted: np.ndarray) -> Optional[np.ndarray]:
+            at = np.minimum(np.searchsorted(sorted_ids, wanted), max(n - 1, 0))
+            if n == 0 or not (sorted_ids[at] == wanted).all():
+                return None
+            return by_id[at]
+
+        old_pos = positions(self.doc_ids)
+        new_pos = positions(np.fromiter((i for i, _ in docs), dtype=np.int64, count=len(docs)))
+        if old_pos is None or new_pos is None:
+            return None
+        if len(np.unique(np.concatenate((old_pos, new_pos)))) != n:
+            return None
+
+        corpus = [_tokenize(text) for _, text in docs]
+        new_len = np.array([len(toks) for toks in corpus], dtype=np.int64)
+        vocab: defaultdict[str, int] = defaultdict(None, self._vocab)
+        vocab.default_factory = vocab.__len__
+        terms = _term_ids(vocab, corpus, int(new_len.sum()))
+        keys, tf = np.unique(terms * n + np.repeat(new_pos, new_len), return_counts=True)
+
+        # Existing postings, re-keyed to the new positions, merged with the new ones
+        old_terms = np.repeat(np.arange(len(self._vocab)), np.diff(self._start))
+        keys = np.concatenate((old_terms * n + old_pos[self._pos], keys))
+        tf = np.concatenate((self._tf, tf))
+        order = np.argsort(keys, kind="stable")
+        doc_len = np.empty(n, dtype=np.int64)
+        doc_len[old_pos] = self._doc_len
+        doc_len[new_pos] = new_len
+
+        index = BM25Index.__new__(BM25Index)
+        index.k1, index.b, index.epsilon = self.k1, self.b, self.epsilon
+        index._build(ids, doc_len, vocab, keys[order], tf[order], n)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def get_scores(self, tokens: Sequence[str]) -> np.ndarray:
+        scores = np.zeros(len(self.doc_ids))
+        for t in tokens:
+            idf = self.idf.get(t) or 0
+            if not idf:
+                continue
+            tid = self._vocab[t]
+            lo, hi = self._start[tid], self._start[tid + 1]
+            # Docs are unique within a posting list, so a fancy-index add is safe
+            scores[self._pos[lo:hi]] += idf * self._impact[lo:hi]
+        return scores
+
+    def search(self, query: str, k: Optional[int] = None) -> List[int]:
+        """
+        Doc ids, best first; ties keep corpus order. With `k`, only the first k of that
+        ranking are returned, selected with a partition instead of a full sort.
+
+        The longest ranking computed per query is memoized on the index (which never
+        changes once built), so paging through or re-sending a query is a slice.
+        """
+        tokens = query_tokens(query)
+        hit = self._results.get(tokens)
+        if hit is not None and (hit[0] is None or (k is not None and k <= hit[0])):
+            self._results.move_to_end(tokens)
+            return hit[1][:k]
+        ids = self._rank(tokens, k)
+        self._results[tokens] = (None if k is None or k >= len(self.doc_ids) else k, ids)
+        if len(self._results) > self.RESULTS_MAXSIZE:
+            self._results.popitem(last=False)
+        return ids[:]
+
+    def _rank(self, tokens: Sequence[str], k: Optional[int]) -> List[int]:
+        n = len(self.doc_ids)
+        if not n or k == 0:
+            return []
+        neg = -self.get_scores(tokens)
+        if not neg.any():
+            # No query term has weight: the ranking is corpus order
+            return self.doc_ids[:k].tolist()
+        if k is None or k >= n:
+            order = np.argsort(neg, kind="stable")
+        else:
+            cut = np.partition(neg, k - 1)[k - 1]
+            better = np.flatnonzero(neg < cut)
+            tied = np.flatnonzero(neg == cut)[: k - len(better)]
+            cand = np.sort(np.concatenate((better, tied)))
+            order = cand[np.argsort(neg[cand], kind="stable")]
+        return self.doc_ids[order].tolist()
 
 def search_bm25(docs: List[Tuple[int, str]], query: str) -> List[int]:
     if not docs:
         return []
-    corpus = [_tokenize(text) for _, text in docs]
-    bm25 = BM25Okapi(corpus)
-    scores = bm25.get_scores(_tokenize(query))
-    ranked = sorted(zip([i for i, _ in docs], scores), key=lambda x: x[1], reverse=True)
-    return [i for i, _ in ranked]
+    return BM25Index.from_docs(docs).search(query)
+
+class BM25Cache:
+    """
+    Built indexes keyed by a caller-chosen scope (the filters that picked the corpus).
+
+    Each entry also stores a corpus fingerprint, e.g. (row count, max id); a lookup with a
+    different fingerprint is a miss, though `stale()` still hands out the old index so the
+    caller can extend it with just the new rows. Writers that can change titles/abstracts
+    or move rows between scopes call `clear()`.
+    """
+
+    def __init__(self, maxsize: int = 16):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, tuple[Hashable, BM25Index]]" = OrderedDict()
+
+    def get(self, scope: Hashable, fingerprint: Hashable) -> Optional[BM25Index]:
+        hit = self._data.get(scope)
+        if hit is None or hit[0] != fingerprint:
+            return None
+        self._data.move_to_end(scope)
+        return hit[1]
+
+    def stale(self, scope: Hashable) -> Optional["tuple[Hashable, BM25Index]"]:
+        """The (fingerprint, index) stored for `scope`, whatever the current fingerprint."""
+        return self._data.get(scope)
+
+    def put(self, scope: Hashable, fingerprint: Hashable, index: BM25Index) -> None:
+        self._data[scope] = (fingerprint, index)
+        self._data.move_to_end(scope)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> int:
+        n = len(self._data)
+        self._data.clear()
+        return n
+
+BM25_CACHE = BM25Cache()
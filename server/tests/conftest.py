@@ -0,0 +1,25 @@
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from server.db import Base
+from server import models  # noqa: F401  (register tables)
+
+
+@pytest.fixture
+def run_db():
+    """Run `body(maker)` on a fresh in-memory SQLite schema and return its result."""
+    def run(body):
+        async def main():
+            engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            maker = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+            try:
+                return await body(maker)
+            finally:
+                await engine.dispose()
+        return asyncio.run(main())
+    return run
@@ -20,3 +20,12 @@ def test_announced_date_weekdays_boundaries():
     for submitted, expected in cases:
         assert _announced_date(submitted) == expected
 
+
+
+def test_paper_keeps_announced_date_in_sync():
+    from server.models import Paper
+
+    p = Paper(arxiv_id="2409.00001", submitted_at="2024-09-19T18:00:00+00:00")
+    assert p.announced_date == "2024-09-22"
+    p.submitted_at = None
+    assert p.announced_date is None
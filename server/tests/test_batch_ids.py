@@ -0,0 +1,43 @@
+from server.routers.papers import paper_ids, score_batch, suggest_tags_batch
+from server.models import Paper
+from server.schemas import BatchScoreReq, BatchSuggestReq
+from server.services.scoring import BM25_CACHE
+
+# Rare terms, so BM25 gives them weight and the ranking differs from newest-first
+TITLES = {1: "wireframe lines", 2: "lines", 4: "wireframe", 7: "wireframe planes", 8: "planes"}
+
+
+def test_batch_endpoints_and_ids_route_pick_the_same_papers(monkeypatch, run_db):
+    # No provider key: the batch calls fall back to offline scores / empty suggestions
+    for var in ("OPENAI_API_KEY", "DEEPSEEK_API_KEY"):
+        monkeypatch.delenv(var, raising=False)
+    monkeypatch.setenv("ARX_LLM_CACHE", "0")
+    BM25_CACHE.clear()
+
+    async def body(maker):
+        async with maker() as s:
+            for i in range(12):
+                s.add(Paper(id=i + 1, arxiv_id=f"2409.{i:05d}", version=1, abstract="x",
+                            title=TITLES.get(i, f"paper {i}"),
+                            authors="A", categories="cs.CV", primary_category="cs.CV",
+                            state=["triage", "must_read"][i % 2],
+                            signals={"rubric": {"total": 1}} if i % 3 == 0 else {}))
+            await s.commit()
+            # The query ranks: its picks are not simply the newest papers
+            newest = await paper_ids(state=None, query=None, missing=None, limit=4, session=s)
+            ranked = await paper_ids(state=None, query="wireframe", missing=None, limit=4, session=s)
+            assert ranked["ids"] != newest["ids"]
+            out = []
+            for state, query, limit in ((None, None, 4), ("triage", None, 3),
+                                        (None, "wireframe", 4), ("triage", "lines planes", 2)):
+                for missing, route, req in (("rubric", score_batch, BatchScoreReq),
+                                            ("suggested_tags", suggest_tags_batch, BatchSuggestReq)):
+                    want = await paper_ids(state=state, query=query, missing=missing, limit=limit, session=s)
+                    got = await route(req(state=state, query=query, limit=limit, delay_ms=0), session=s)
+                    out.append((want["ids"], got["ids"]))
+            return out
+
+    pairs = run_db(body)
+    assert all(want for want, _ in pairs[:3])
+    for want, got in pairs:
+        assert want == got
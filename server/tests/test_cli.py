@@ -0,0 +1,28 @@
+from types import SimpleNamespace as P
+
+from sqlalchemy import select
+
+from cli.arx import __main__ as cli
+from server.models import Paper
+from server.routers.papers import bulk_state
+from server.schemas import BulkStateReq
+
+
+def test_keep_many_stores_must_read(monkeypatch, run_db):
+    sent = []
+    monkeypatch.setattr(cli.SESSION, "post", lambda url, json, timeout: sent.append((url, json)) or P(json=dict))
+    cli.keep_many([1, 2])
+    assert [url for url, _ in sent] == [f"{cli.API}/v1/papers/bulk-state"]
+
+    async def body(maker):
+        async with maker() as s:
+            for i in (1, 2, 3):
+                s.add(Paper(id=i, arxiv_id=f"2409.{i:05d}", version=1, title="t", abstract="x",
+                            authors="A", categories="cs.CV", primary_category="cs.CV", state="triage"))
+            await s.commit()
+            out = await bulk_state(BulkStateReq(**sent[0][1]), session=s)
+            return out, (await s.execute(select(Paper.state).order_by(Paper.id))).scalars().all()
+
+    out, states = run_db(body)
+    assert out == {"ok": True, "updated": 2}
+    assert states == ["must_read", "must_read", "triage"]
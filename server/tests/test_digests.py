@@ -0,0 +1,11 @@
+from types import SimpleNamespace as P
+
+from server.routers.digests import pick_top
+
+
+def test_pick_top_priority_and_skips_other_states():
+    states = ["triage", "archived", "further_read", "shortlist", "hidden", "must_read", "triage"]
+    papers = [P(id=i, state=s) for i, s in enumerate(states)]
+    assert [p.id for p in pick_top(papers, top_k=4)] == [3, 5, 2, 0]
+    assert [p.id for p in pick_top(papers, top_k=1)] == [3]
+    assert [p.id for p in pick_top(papers, top_k=10)] == [3, 5, 2, 0, 6]
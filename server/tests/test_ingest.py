@@ -0,0 +1,31 @@
+from sqlalchemy import select
+
+from server.models import Paper
+from server.services.ingest import upsert_papers
+
+
+def _paper(arxiv_id, **kw):
+    p = dict(arxiv_id=arxiv_id, version=1, title="T", abstract="A", authors="X", categories="cs.CV",
+             primary_category="cs.CV", submitted_at="2024-09-16T19:00:00+00:00", updated_at=None,
+             links_pdf=None, links_abs=None, links_html=None, extra={})
+    p.update(kw)
+    return p
+
+
+def test_upsert_updates_in_place_and_keeps_triage_fields(run_db):
+    async def body(maker):
+        async with maker() as s:
+            await upsert_papers(s, [_paper("2409.00001"), _paper("2409.00002"), _paper("2409.00001", title="last wins")])
+            row = (await s.execute(select(Paper).where(Paper.arxiv_id == "2409.00001"))).scalar_one()
+            row.state, row.tags = "must_read", {"list": ["keep"]}
+            await s.commit()
+            await upsert_papers(s, [_paper("2409.00001", title="New", submitted_at="2024-09-17T12:00:00+00:00")])
+        async with maker() as s:
+            return (await s.execute(select(Paper).order_by(Paper.id))).scalars().all()
+
+    rows = run_db(body)
+    assert [r.arxiv_id for r in rows] == ["2409.00001", "2409.00002"]
+    r = rows[0]
+    assert (r.title, r.state, r.tags) == ("New", "must_read", {"list": ["keep"]})
+    # announced_date follows submitted_at without the ORM validator
+    assert r.announced_date == "2024-09-17" and rows[1].announced_date == "2024-09-17"
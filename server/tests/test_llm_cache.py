@@ -0,0 +1,89 @@
+from server.services import llm_cache
+
+
+def test_rubric_cached_by_content(monkeypatch, run_db):
+    calls = []
+
+    def fake(title, abstract, provider, fallback):
+        calls.append(title)
+        return {"novelty": 4, "evidence": 3, "clarity": 3, "reusability": 3, "fit": 3, "total": 16}
+
+    monkeypatch.setattr(llm_cache, "llm_rubric_score", fake)
+
+    async def body(maker):
+        async with maker() as s:
+            a = await llm_cache.cached_rubric_score(s, "T", "A", "openai")
+            await s.commit()
+        async with maker() as s:
+            b = await llm_cache.cached_rubric_score(s, "T", "A", "openai")
+            await llm_cache.cached_rubric_score(s, "T", "A changed", "openai")
+        return a, b
+
+    a, b = run_db(body)
+    assert a == b
+    assert calls == ["T", "T"]
+
+
+def test_fallbacks_not_cached(monkeypatch, run_db):
+    calls = []
+
+    def fake(title, abstract, provider, fallback):
+        calls.append(title)
+        return None
+
+    monkeypatch.setattr(llm_cache, "llm_rubric_score", fake)
+
+    async def body(maker):
+        async with maker() as s:
+            first = await llm_cache.cached_rubric_score(s, "T", "A", None)
+            await s.commit()
+            await llm_cache.cached_rubric_score(s, "T", "A", None)
+        return first
+
+    first = run_db(body)
+    assert first["total"] > 0  # heuristic
+    assert len(calls) == 2
+
+
+def test_batch_runs_misses_concurrently_and_reuses_hits(monkeypatch, run_db):
+    import threading
+    import time
+
+    lock = threading.Lock()
+    state = {"now": 0, "peak": 0, "calls": 0}
+
+    def fake(title, abstract, provider, fallback):
+        with lock:
+            state["now"] += 1
+            state["calls"] += 1
+            state["peak"] = max(state["peak"], state["now"])
+        time.sleep(0.05)
+        with lock:
+            state["now"] -= 1
+        if title == "boom":
+            raise RuntimeError("provider down")
+        return {"novelty": 3, "evidence": 3, "clarity": 3, "reusability": 3, "fit": 3, "total": 15}
+
+    monkeypatch.setattr(llm_cache, "llm_rubric_score", fake)
+    items = [(f"T{i}", "A") for i in range(6)] + [("boom", "A")]
+
+    async def body(maker):
+        async with maker() as s:
+            first = await llm_cache.cached_rubric_score_many(s, items, "openai", concurrency=3)
+            await s.commit()
+        async with maker() as s:
+            second = await llm_cache.cached_rubric_score_many(s, items, "openai", concurrency=3)
+        return first, second
+
+    first, second = run_db(body)
+    assert isinstance(first[-1], RuntimeError) and isinstance(second[-1], RuntimeError)
+    assert first[:-1] == second[:-1]
+    assert 1 < state["peak"] <= 3
+    assert state["calls"] == 8  # 7 misses, then only the failed item again
+
+
+def test_key_changes_with_model(monkeypatch):
+    monkeypatch.setenv("LLM_MODEL", "model-a")
+    a = llm_cache.item_key("rubric", "openai", "T", "A")
+    monkeypatch.setenv("LLM_MODEL", "model-b")
+    assert llm_cache.item_key("rubric", "openai", "T", "A") != a
@@ -0,0 +1,63 @@
+import numpy as np
+
+from server.services.scoring import BM25Index, _tokenize, search_bm25
+
+
+def test_bm25_ranks_matching_docs_first_and_keeps_order_for_ties():
+    docs = [
+        (10, "Wireframe parsing with lines"),
+        (11, "Diffusion models for images"),
+        (12, "Line segment detection"),
+        (13, "Diffusion of diffusion: a study of diffusion"),
+        (14, "Planar reconstruction"),
+    ]
+    assert search_bm25(docs, "diffusion") == [13, 11, 10, 12, 14]
+    assert search_bm25(docs, "nothing matches") == [10, 11, 12, 13, 14]
+    assert search_bm25([], "x") == []
+
+
+def test_bm25_repeated_query_terms_accumulate():
+    corpus = [_tokenize(t) for t in ("a b c", "a a d", "e f g", "h i j", "k")]
+    index = BM25Index([1, 2, 3, 4, 5], corpus)
+    once, twice = index.get_scores(["a"]), index.get_scores(["a", "a"])
+    assert (twice == 2 * once).all()
+    assert once[1] > once[0] > 0 == once[2]
+
+
+def test_bm25_top_k_is_prefix_of_full_ranking():
+    import random
+    rng = random.Random(0)
+    words = ["line", "plane", "map", "slam", "net", "depth"]
+    docs = [(i, " ".join(rng.choices(words, k=rng.randint(0, 8)))) for i in range(200)]
+    index = BM25Index.from_docs(docs)
+    for q in ("line", "plane depth", "slam slam net", "unknown"):
+        full = index.search(q)
+        assert len(full) == len(docs)
+        for k in (0, 1, 7, 50, 199, 200, 500):
+            # A fresh index ranks with the partition; `index` serves its memoized ranking
+            assert BM25Index.from_docs(docs).search(q, k=k) == full[:k], (q, k)
+            assert index.search(q, k=k) == full[:k], (q, k)
+    # Memoized rankings grow with k and are handed out as copies
+    full = BM25Index.from_docs(docs).search("line")
+    index = BM25Index.from_docs(docs)
+    assert index.search("line", k=5) == full[:5]
+    assert index.search("line", k=60) == full[:60]
+    index.search("line", k=3).clear()
+    assert index.search("line", k=3) == full[:3]
+
+
+def test_bm25_extended_matches_rebuild():
+    import random
+    rng = random.Random(1)
+    words = ["line", "plane", "map", "slam", "net", "depth", "a", "b"]
+    docs = [(i * 3 + 1, " ".join(rng.choices(words, k=rng.randint(0, 8)))) for i in range(120)]
+    rng.shuffle(docs)
+    old, new = docs[::3] + docs[1::3], docs[2::3]
+    index = BM25Index.from_docs(old).extended([i for i, _ in docs], new)
+    full = BM25Index.from_docs(docs)
+    for q in ("line", "plane depth", "slam slam net", "a b", "unknown"):
+        assert np.allclose(index.get_scores(_tokenize(q)), full.get_scores(_tokenize(q)))
+        assert index.search(q) == full.search(q), q
+    # Any other change to the corpus than the given additions needs a rebuild
+    assert BM25Index.from_docs(old).extended([i for i, _ in docs][1:], new) is None
+    assert BM25Index.from_docs(old).extended([i for i, _ in new], new) is None
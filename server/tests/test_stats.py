@@ -0,0 +1,78 @@
+from server.models import Paper
+from server.routers.papers import papers_stats
+
+TAGS = [{"list": ["a", " b"]}, {"list": []}, None, {"list": ["b", ""]}, {}]
+
+
+def _stats(run_db, **filters):
+    params = dict(state=None, query=None, has_note=None, category=None, tag=None,
+                  announced_date=None, arxiv_id=None)
+    params.update(filters)
+
+    async def body(maker):
+        async with maker() as s:
+            for i, tags in enumerate(TAGS * 2):
+                s.add(Paper(arxiv_id=f"2409.{i:05d}", version=1, title=f"t{i}", abstract="x",
+                            authors="A", categories="cs.CV", tags=tags,
+                            primary_category=["cs.CV", "", " "][i % 3],
+                            state=["triage", "shortlist"][i % 2]))
+            await s.commit()
+            return await papers_stats(session=s, **params)
+    return run_db(body)
+
+
+def _expected(state=None, category=None, **_):
+    # Counts computed directly from the seeded rows (see _stats)
+    cats, tag_counts, empty = {}, {}, 0
+    for i, tags in enumerate(TAGS * 2):
+        cat, st = ["cs.CV", "", " "][i % 3], ["triage", "shortlist"][i % 2]
+        if state and st not in ({"must_read", "shortlist"} if state == "must_read" else {state}):
+            continue
+        if category and cat != category:
+            continue
+        cats[cat.strip() or "unknown"] = cats.get(cat.strip() or "unknown", 0) + 1
+        names = (tags or {}).get("list") or []
+        empty += not names
+        for name in filter(None, (n.strip() for n in names)):
+            tag_counts[name] = tag_counts.get(name, 0) + 1
+    return {"ok": True, "total": sum(cats.values()), "categories": cats,
+            "tags": tag_counts, "empty_tag_count": empty}
+
+
+def test_stats_match_counts_from_rows(run_db):
+    # A query never narrows the counts: BM25 keeps every row.
+    for filters in ({}, {"state": "must_read"}, {"state": "triage"}, {"category": "cs.CV"},
+                    {"query": "zzz"}, {"query": "zzz", "category": "cs.CV"}):
+        assert _stats(run_db, **filters) == _expected(**filters), filters
+    assert _stats(run_db) == {
+        "ok": True, "total": 10, "categories": {"cs.CV": 4, "unknown": 6},
+        "tags": {"a": 2, "b": 4}, "empty_tag_count": 6,
+    }
+
+
+def test_note_and_tag_filters_match_python_semantics(run_db):
+    from sqlalchemy import select
+    from server.routers.papers import _extra_conds
+
+    extras = [{"note": " \t"}, {"note": "x"}, {"note": None}, {"note": 0}, {"note": ""}, {}, None, {"a": 1}]
+    tags = [{"list": ["a", "b"]}, {"list": []}, None, {"list": ["a"]}, {}, {"list": ["b"]}, {"list": None}, {"x": 1}]
+
+    async def body(maker):
+        async with maker() as s:
+            for i, (extra, tg) in enumerate(zip(extras, tags)):
+                s.add(Paper(id=i + 1, arxiv_id=f"2409.{i:05d}", version=1, title="t", abstract="x",
+                            authors="A", categories="cs.CV", primary_category="cs.CV",
+                            extra=extra, tags=tg, state="triage"))
+            await s.commit()
+            out = {}
+            for has_note, tag in ((True, None), (False, None), (None, "a"), (None, "empty")):
+                res = await s.execute(select(Paper.id).where(*_extra_conds("sqlite", has_note, tag, None)))
+                out[has_note, tag] = sorted(res.scalars())
+            return out
+
+    got = run_db(body)
+    noted = [i + 1 for i, e in enumerate(extras) if str((e or {}).get("note", "")).strip()]
+    assert got[True, None] == noted
+    assert got[False, None] == [i for i in range(1, 9) if i not in noted]
+    assert got[None, "a"] == [i + 1 for i, t in enumerate(tags) if "a" in ((t or {}).get("list") or [])]
+    assert got[None, "empty"] == [i + 1 for i, t in enumerate(tags) if not ((t or {}).get("list") or [])]
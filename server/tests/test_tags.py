@@ -0,0 +1,43 @@
+from types import SimpleNamespace as P
+
+from sqlalchemy import select, update
+
+from server.models import Paper
+from server.routers.papers import _apply_tags, _tags_merge
+
+CASES = [
+    (None, ["b", "a", "b"], None),
+    ({"list": ["a", "c", "e"]}, ["d", "b", "a"], ["e"]),
+    ({"list": ["c", "a", "a"]}, ["b"], ["x"]),  # unsorted legacy list
+    ({"list": ["a", "b"]}, ["c"], ["c", "a"]),  # remove wins over add
+    ({"list": []}, None, None),
+    ({"list": ["Z", "é", "a"], "x": 1}, ["_"], []),  # code point order; other keys dropped
+]
+
+
+def test_apply_tags_matches_set_semantics():
+    for tags, add, remove in CASES:
+        p = P(tags=tags)
+        _apply_tags(p, add, remove)
+        expected = set((tags or {}).get("list", [])) | set(add or ())
+        assert p.tags == {"list": sorted(expected - set(remove or ()))}
+
+
+def test_sql_tags_merge_matches_apply_tags(run_db):
+    async def body(maker):
+        async with maker() as s:
+            out = []
+            for tags, add, remove in CASES:
+                p = Paper(arxiv_id="2409.00001", version=len(out) + 1, title="t", abstract="x",
+                          authors="A", categories="cs.CV", primary_category="cs.CV", tags=tags)
+                s.add(p)
+                await s.flush()
+                stmt = update(Paper).where(Paper.id == p.id).values(tags=_tags_merge("sqlite", add, remove))
+                await s.execute(stmt.execution_options(synchronize_session=False))
+                out.append((await s.execute(select(Paper.tags).where(Paper.id == p.id))).scalar_one())
+            return out
+
+    for sql, (tags, add, remove) in zip(run_db(body), CASES):
+        p = P(tags=tags)
+        _apply_tags(p, add, remove)
+        assert sql == p.tags, (tags, add, remove)